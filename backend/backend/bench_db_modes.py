@@ -0,0 +1,91 @@
+"""
+Compares the sync (threadpool) and async (asyncpg) database modes under dashboard-style load.
+
+Each simulated request does what an authenticated GET /patients/{patient_id} costs:
+resolve the doctor by email, then load the patient. Requests run concurrently on one
+event loop through the same crud helpers the routes use, so the only difference
+between the two runs is the session type.
+
+Usage:
+    python bench_db_modes.py --doctor-email doc@example.com --patient-id ABC123
+                             [--requests 2000] [--concurrency 100] [--modes sync async]
+
+Each mode's result is printed as one JSON line.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import crud
+import database
+
+
+async def _dashboard_request(session_factory, doctor_email, patient_id, is_async):
+    start = time.perf_counter()
+    if is_async:
+        async with session_factory() as db:
+            await crud.get_doctor_by_email(db, doctor_email)
+            await crud.get_patient_by_id(db, patient_id)
+    else:
+        db = session_factory()
+        try:
+            await crud.get_doctor_by_email(db, doctor_email)
+            await crud.get_patient_by_id(db, patient_id)
+        finally:
+            db.close()
+    return time.perf_counter() - start
+
+
+async def run_mode(mode, args):
+    is_async = mode == "async"
+    if is_async:
+        engine, session_factory = database.make_async_sessionmaker()
+    else:
+        engine, session_factory = database.engine, database.SessionLocal
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited():
+        async with semaphore:
+            return await _dashboard_request(session_factory, args.doctor_email, args.patient_id, is_async)
+
+    # Warm the connection pool before timing
+    await asyncio.gather(*(limited() for _ in range(args.concurrency)))
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(limited() for _ in range(args.requests))))
+    elapsed = time.perf_counter() - start
+
+    if is_async:
+        await engine.dispose()
+
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "pool_size": database.DB_POOL_SIZE,
+        "max_overflow": database.DB_MAX_OVERFLOW,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(args.requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctor-email", required=True)
+    parser.add_argument("--patient-id", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        print(json.dumps(asyncio.run(run_mode(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Login throughput benchmark.
+
+"pool" mode measures bcrypt verifications per second through the hashing process pool at
+increasing pool sizes, which should scale roughly linearly up to the core count.
+"http" mode fires concurrent POST /doctors/login/ requests at a running API.
+
+Usage:
+    python bench_login.py pool [--requests 64] [--workers 1 2 4 8]
+    python bench_login.py http --email doc@example.com --password secret
+                               [--base-url http://localhost:8000] [--requests 200] [--concurrency 32]
+
+Each measurement is printed as one JSON line.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import hashing
+
+
+async def _verify_burst(password_hash: str, requests: int):
+    await asyncio.gather(*(hashing.verify_password("secret", password_hash) for _ in range(requests)))
+
+
+def bench_pool(requests: int, worker_counts):
+    password_hash = hashing.pwd_context.hash("secret")
+    baseline = None
+    for workers in worker_counts:
+        hashing.configure(workers)
+        # Warm the pool so process start-up isn't part of the measurement
+        asyncio.run(_verify_burst(password_hash, workers))
+
+        start = time.perf_counter()
+        asyncio.run(_verify_burst(password_hash, requests))
+        elapsed = time.perf_counter() - start
+
+        throughput = requests / elapsed
+        baseline = baseline or throughput
+        print(json.dumps({
+            "mode": "pool",
+            "workers": workers,
+            "requests": requests,
+            "seconds": round(elapsed, 3),
+            "logins_per_sec": round(throughput, 2),
+            "speedup": round(throughput / baseline, 2),
+        }))
+    hashing.shutdown()
+
+
+def _login(base_url: str, email: str, password: str):
+    body = json.dumps({"email": email, "password": password}).encode()
+    request = urllib.request.Request(
+        f"{base_url}/doctors/login/", data=body, headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            ok = response.status == 200
+    except urllib.error.URLError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def bench_http(base_url: str, email: str, password: str, requests: int, concurrency: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: _login(base_url, email, password), range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    print(json.dumps({
+        "mode": "http",
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round(requests / elapsed, 2),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+        "errors": errors,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    pool = subparsers.add_parser("pool")
+    pool.add_argument("--requests", type=int, default=64)
+    cores = os.cpu_count() or 1
+    pool.add_argument("--workers", type=int, nargs="+",
+                      default=sorted({1, 2, max(1, cores // 2), cores}))
+
+    http = subparsers.add_parser("http")
+    http.add_argument("--base-url", default="http://localhost:8000")
+    http.add_argument("--email", required=True)
+    http.add_argument("--password", required=True)
+    http.add_argument("--requests", type=int, default=200)
+    http.add_argument("--concurrency", type=int, default=32)
+
+    args = parser.parse_args()
+    if args.mode == "pool":
+        bench_pool(args.requests, args.workers)
+    else:
+        bench_http(args.base_url, args.email, args.password, args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Union
+
+import models
+
+# The async routes go through these helpers so they work with either session type:
+# AsyncSessions (DB_MODE=async) are awaited directly, while blocking Sessions run their
+# query in the threadpool and keep the event loop free for other requests.
+
+AnySession = Union[Session, AsyncSession]
+
+
+async def _first(db: AnySession, statement):
+    if isinstance(db, AsyncSession):
+        return (await db.execute(statement)).scalars().first()
+    return await run_in_threadpool(lambda: db.execute(statement).scalars().first())
+
+
+async def _all(db: AnySession, statement):
+    if isinstance(db, AsyncSession):
+        return (await db.execute(statement)).scalars().all()
+    return await run_in_threadpool(lambda: db.execute(statement).scalars().all())
+
+
+async def get_patient_by_email(db: AnySession, email: str):
+    return await _first(db, select(models.Patient).where(models.Patient.email == email))
+
+
+async def get_patient_by_id(db: AnySession, patient_id: str):
+    return await _first(db, select(models.Patient).where(models.Patient.patient_id == patient_id))
+
+
+async def get_doctor_by_email(db: AnySession, email: str):
+    return await _first(db, select(models.Doctor).where(models.Doctor.email == email))
+
+
+async def get_test_history(db: AnySession, patient_id: str):
+    """A patient's MoCA summaries, newest first (idx_moca_test_summary_patient_date)."""
+    return await _all(
+        db,
+        select(models.TestSummary)
+        .where(models.TestSummary.patient_id == patient_id)
+        .order_by(models.TestSummary.test_date.desc()),
+    )
+
+
+async def save(db: AnySession, instance):
+    """Add, commit and refresh a new row."""
+    if isinstance(db, AsyncSession):
+        db.add(instance)
+        await db.commit()
+        await db.refresh(instance)
+        return instance
+
+    def _save():
+        db.add(instance)
+        db.commit()
+        db.refresh(instance)
+        return instance
+
+    return await run_in_threadpool(_save)
+
+
+async def rollback(db: AnySession):
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
@@ -1,9 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from urllib.parse import quote_plus
 
+import metrics
+
 # Get database credentials from environment variables with new defaults
 DB_USER = os.getenv("POSTGRES_USER", "admin")
 DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "secret")
@@ -11,24 +14,58 @@ DB_HOST = os.getenv("POSTGRES_HOST", "10.0.0.205")  # Updated host
 DB_PORT = os.getenv("POSTGRES_PORT", "5432")
 DB_NAME = os.getenv("POSTGRES_DB", "parkinsons")
 
+# "sync" serves route queries from blocking psycopg2 sessions in the threadpool,
+# "async" awaits them on an asyncpg engine instead
+DB_MODE = os.getenv("DB_MODE", "sync")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
 # Create database URL with encoded password
 DATABASE_URL = f"postgresql://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # Create engine with updated settings
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-    echo=True  # Add this for debugging SQL queries
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
 )
+# Statement timings and the sampled slow-query log replace per-statement echo logging
+metrics.instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def make_async_sessionmaker():
+    """Create an asyncpg engine and a factory for AsyncSessions bound to it."""
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    # Cursor events fire on the sync engine the asyncpg engine wraps
+    metrics.instrument_engine(async_engine.sync_engine)
+    # Rows stay readable after commit without another round-trip
+    return async_engine, sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Only build the asyncpg engine when it's used, so sync deployments don't need asyncpg
+if DB_MODE == "async":
+    async_engine, AsyncSessionLocal = make_async_sessionmaker()
+else:
+    async_engine, AsyncSessionLocal = None, None
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for the async routes, following DB_MODE
+get_session = get_async_db if DB_MODE == "async" else get_db
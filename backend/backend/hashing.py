@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+import metrics
+
+# bcrypt costs ~100 ms of CPU per call, so hashing runs in a dedicated process pool
+# (one process per core by default) instead of on the event loop or its threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = None
+
+
+# Workers report how long bcrypt itself took, so the metric excludes time queued for a worker
+def _hash(password: str):
+    start = time.perf_counter()
+    return pwd_context.hash(password), time.perf_counter() - start
+
+
+def _verify(password: str, password_hash: str):
+    start = time.perf_counter()
+    return pwd_context.verify(password, password_hash), time.perf_counter() - start
+
+
+def _observed(operation: str, result):
+    value, seconds = result
+    metrics.BCRYPT_SECONDS.observe(seconds, operation)
+    return value
+
+
+def configure(workers: int = PASSWORD_HASH_WORKERS) -> ProcessPoolExecutor:
+    """Start (or restart) the hashing pool with the given number of processes."""
+    global _executor
+    shutdown()
+    # spawn keeps the workers free of the API's threads and open DB connections
+    _executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    return _executor
+
+
+def get_executor() -> ProcessPoolExecutor:
+    if _executor is None:
+        configure()
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return _observed("hash", await loop.run_in_executor(get_executor(), _hash, password))
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return _observed("verify", await loop.run_in_executor(get_executor(), _verify, password, password_hash))
+
+
+# Blocking variants for the sync routes, which FastAPI already runs in its threadpool
+def hash_password_sync(password: str) -> str:
+    return _observed("hash", get_executor().submit(_hash, password).result())
+
+
+def verify_password_sync(password: str, password_hash: str) -> bool:
+    return _observed("verify", get_executor().submit(_verify, password, password_hash).result())
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import tempfile
+
+# Content-addressed image store: each image lives at <root>/<ab>/<cd>/<sha256>, and only the
+# key is kept in Postgres. The processing service reads the same layout (processing/utils.py).
+IMAGE_STORE_ROOT = os.getenv("IMAGE_STORE_ROOT", "/var/lib/parkinsons/images")
+
+# When set (e.g. "/image-store/"), downloads proxied by nginx (which marks them with
+# X-Image-Store-Accel) are handed back to it via X-Accel-Redirect so the file is sent with
+# sendfile instead of being copied through the API process. Requests reaching the API directly
+# still get the file from the API.
+IMAGE_STORE_ACCEL_PREFIX = os.getenv("IMAGE_STORE_ACCEL_PREFIX")
+
+# Largest upload accepted; drawings are a few hundred KB
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+
+
+class ImageTooLarge(Exception):
+    """Raised by put_stream when the image runs past max_bytes; nothing is stored."""
+
+
+def relative_path(key: str) -> str:
+    return os.path.join(key[:2], key[2:4], key)
+
+
+def path_for(key: str) -> str:
+    return os.path.join(IMAGE_STORE_ROOT, relative_path(key))
+
+
+def media_type(header: bytes) -> str:
+    """Guess the media type from the first bytes, since the store keeps no file extensions."""
+    if header.startswith(b"\x89PNG"):
+        return "image/png"
+    if header.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+
+def media_type_of(key: str) -> str:
+    with open(path_for(key), "rb") as f:
+        return media_type(f.read(8))
+
+
+def put_stream(chunks, max_bytes: int = None) -> str:
+    """Write an image from an iterable of byte chunks and return its key."""
+    tmp_dir = os.path.join(IMAGE_STORE_ROOT, ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ImageTooLarge(f"Image is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                tmp.write(chunk)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+    key = digest.hexdigest()
+    final_path = path_for(key)
+    if os.path.exists(final_path):
+        # Same content is already stored
+        os.unlink(tmp.name)
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp.name, final_path)
+    return key
+
+
+def put(data: bytes) -> str:
+    return put_stream([data])
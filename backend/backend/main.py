@@ -1,10 +1,24 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Response
-from sqlalchemy.orm import Session
-from database import get_db, engine, SessionLocal
-import models, schemas
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Response, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse
+from starlette.routing import Match
+from sqlalchemy import tuple_, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, load_only, undefer
+from database import get_db, get_session, engine, SessionLocal, AsyncSessionLocal
+import models, schemas, crud, hashing, image_store, metrics, partitions, score_events
+from pagination import encode_cursor, decode_cursor
+from principal_cache import principal_cache
+from image_cache import image_cache
+import hashlib
+import itertools
 from typing import List, Union, Optional
 import uuid
-from passlib.context import CryptContext
+import os
+import asyncio
+import json
+import time
+import urllib.error
+import urllib.request
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
@@ -16,8 +30,11 @@ SECRET_KEY = "kaCqDqiOhMEToozcCJ0WN5_eVJgVJjr3BrKe8Zx9Fw0"  # Change this to a s
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Processing service that scores a test once all of its subtests are stored
+PROCESSING_URL = os.getenv("PROCESSING_URL", "http://10.0.0.206:5433")
+PROCESSING_SUBMIT_ATTEMPTS = int(os.getenv("PROCESSING_SUBMIT_ATTEMPTS", "5"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Update the token creation function with Union type
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
@@ -41,8 +58,82 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Lets the dashboard read the next page cursor
 )
 
+def _route_template(request: Request) -> str:
+    # Label by path template (/patients/{patient_id}) so metrics don't grow per patient
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = _route_template(request)
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, route)
+        metrics.REQUEST_COUNT.inc(request.method, route, status_code)
+
+# Gauges and cache counters read at scrape time
+metrics.register_collector("db_pool_size", "gauge", "Configured connection pool size.", lambda: engine.pool.size())
+metrics.register_collector("db_pool_checked_out", "gauge", "Connections currently checked out of the pool.",
+                           lambda: engine.pool.checkedout())
+metrics.register_collector("db_pool_overflow", "gauge", "Connections open beyond pool_size (negative while below it).",
+                           lambda: engine.pool.overflow())
+metrics.register_collector("principal_cache_entries", "gauge", "Users held in the principal cache.",
+                           lambda: principal_cache.stats()["size"])
+metrics.register_collector("image_cache_bytes", "gauge", "Bytes held in the image cache.",
+                           lambda: image_cache.stats()["bytes"])
+for _cache_name, _cache in (("principal_cache", principal_cache), ("image_cache", image_cache)):
+    metrics.register_collector(f"{_cache_name}_events_total", "counter", f"Lookups and evictions of the {_cache_name}.",
+                               lambda cache=_cache: {key: value for key, value in cache.stats().items()
+                                                     if key in ("hits", "misses", "evictions", "invalidations")},
+                               label="event")
+metrics.register_collector("score_event_streams", "gauge", "Open dashboard score event streams.",
+                           lambda: score_events.hub.stats()["streams"])
+metrics.register_collector("score_events_total", "counter", "Score notifications received, and events delivered to or dropped from streams.",
+                           lambda: {key: value for key, value in score_events.hub.stats().items()
+                                    if key in ("notifications", "delivered", "dropped")},
+                           label="event")
+
+@app.on_event("startup")
+def start_password_hashing():
+    # Spawn the bcrypt pool up front so the first login doesn't pay for it
+    hashing.get_executor()
+
+@app.on_event("shutdown")
+def stop_password_hashing():
+    hashing.shutdown()
+
+@app.on_event("startup")
+async def start_partition_maintenance():
+    # Creates upcoming test_records partitions now and daily after that
+    app.state.partition_task = asyncio.create_task(partitions.maintain_partitions())
+
+@app.on_event("shutdown")
+async def stop_partition_maintenance():
+    app.state.partition_task.cancel()
+
+@app.on_event("startup")
+async def start_score_events():
+    # One LISTEN connection per process feeds every open dashboard stream
+    app.state.score_events_task = None
+    if score_events.SCORE_EVENTS_LISTEN:
+        app.state.score_events_task = asyncio.create_task(score_events.listen())
+
+@app.on_event("shutdown")
+async def stop_score_events():
+    if app.state.score_events_task is not None:
+        app.state.score_events_task.cancel()
+
 @app.get("/health")
 async def health_check():
     db = None
@@ -70,15 +161,26 @@ async def health_check():
             db.close()
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the JWT principal cache."""
+    return {"principal_cache": principal_cache.stats(), "image_cache": image_cache.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request, bcrypt, DB and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # Signup route for patients
 @app.post("/signup/", response_model=schemas.PatientResponse)
 def create_patient(patient: schemas.PatientCreate, db: Session = Depends(get_db)):
     try:
-        hashed_password = pwd_context.hash(patient.password)
+        hashed_password = hashing.hash_password_sync(patient.password)
         db_patient = models.Patient(
             first_name=patient.first_name,
             last_name=patient.last_name,
-            doctor_id=patient.doctor_id,
             email=patient.email,
             age=patient.age,
             gender=patient.gender,
@@ -109,9 +211,33 @@ def create_patient(patient: schemas.PatientCreate, db: Session = Depends(get_db)
             detail=f"Failed to create patient: {str(e)}"
         )
 
+# Stable page order, served by idx_patients_created_at_id
+PATIENT_ORDER = (models.Patient.created_at, models.Patient.patient_id)
+
 @app.get("/patients/", response_model=List[schemas.Patient])
-def get_patients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    patients = db.query(models.Patient).offset(skip).limit(limit).all()
+def get_patients(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List patients in (created_at, patient_id) order.
+    Pass the X-Next-Cursor header of a page as `cursor` to get the next one; `skip` still
+    works for older clients but gets slower the deeper the page.
+    """
+    query = db.query(models.Patient).order_by(*PATIENT_ORDER)
+    if cursor:
+        created_at, patient_id = decode_cursor(cursor)
+        query = query.filter(tuple_(*PATIENT_ORDER) > tuple_(created_at, patient_id))
+    elif skip:
+        query = query.offset(skip)
+
+    patients = query.limit(limit).all()
+    if patients and len(patients) == limit:
+        last = patients[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.patient_id)
     return patients
 
 # Login route for patients
@@ -128,7 +254,7 @@ def login(credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
         )
     
     # Verify password
-    if not pwd_context.verify(credentials.password, patient.password_hash):
+    if not hashing.verify_password_sync(credentials.password, patient.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -152,7 +278,7 @@ def login(credentials: schemas.LoginRequest, db: Session = Depends(get_db)):
 # Optional: Add a function to get current user for protected routes
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -168,10 +294,17 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
         
-    patient = db.query(models.Patient).filter(models.Patient.email == email).first()
+    patient = principal_cache.get("patient", email)
+    if patient is not None:
+        return patient
+
+    patient = await crud.get_patient_by_email(db, email)
     if patient is None:
         raise credentials_exception
-        
+
+    # Detach before caching so later commits on this session can't expire the cached copy
+    db.expunge(patient)
+    principal_cache.put("patient", email, patient, payload.get("exp"))
     return patient
 
 # Example of a protected route
@@ -205,9 +338,9 @@ async def get_patient_profile(current_user: models.Patient = Depends(get_current
 
 # Doctor signup route
 @app.post("/doctors/signup/", response_model=schemas.DoctorResponse)
-async def create_doctor(doctor: schemas.DoctorCreate, db: Session = Depends(get_db)):
+async def create_doctor(doctor: schemas.DoctorCreate, db: Session = Depends(get_session)):
     # Check if email already exists
-    db_doctor = db.query(models.Doctor).filter(models.Doctor.email == doctor.email).first()
+    db_doctor = await crud.get_doctor_by_email(db, doctor.email)
     if db_doctor:
         raise HTTPException(
             status_code=400,
@@ -216,7 +349,7 @@ async def create_doctor(doctor: schemas.DoctorCreate, db: Session = Depends(get_
     
     try:
         # Create new doctor
-        hashed_password = pwd_context.hash(doctor.password)
+        hashed_password = await hashing.hash_password(doctor.password)
         db_doctor = models.Doctor(
             first_name=doctor.first_name,
             last_name=doctor.last_name,
@@ -225,9 +358,7 @@ async def create_doctor(doctor: schemas.DoctorCreate, db: Session = Depends(get_
             password_hash=hashed_password
         )
         
-        db.add(db_doctor)
-        db.commit()
-        db.refresh(db_doctor)
+        await crud.save(db, db_doctor)
         
         # Create access token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -243,7 +374,7 @@ async def create_doctor(doctor: schemas.DoctorCreate, db: Session = Depends(get_
             access_token=access_token
         )
     except Exception as e:
-        db.rollback()
+        await crud.rollback(db)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create doctor: {str(e)}"
@@ -251,9 +382,9 @@ async def create_doctor(doctor: schemas.DoctorCreate, db: Session = Depends(get_
 
 # Doctor login route
 @app.post("/doctors/login/", response_model=schemas.DoctorResponse)
-async def login_doctor(credentials: schemas.DoctorLogin, db: Session = Depends(get_db)):
+async def login_doctor(credentials: schemas.DoctorLogin, db: Session = Depends(get_session)):
     # Find doctor by email
-    doctor = db.query(models.Doctor).filter(models.Doctor.email == credentials.email).first()
+    doctor = await crud.get_doctor_by_email(db, credentials.email)
     if not doctor:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -262,7 +393,7 @@ async def login_doctor(credentials: schemas.DoctorLogin, db: Session = Depends(g
         )
     
     # Verify password
-    if not pwd_context.verify(credentials.password, doctor.password_hash):
+    if not await hashing.verify_password(credentials.password, doctor.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -283,11 +414,8 @@ async def login_doctor(credentials: schemas.DoctorLogin, db: Session = Depends(g
         access_token=access_token
     )
 
-# Get current doctor helper function
-async def get_current_doctor(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+# Resolves a doctor's bearer token, whether it came in the Authorization header or the query string
+async def authenticate_doctor(token: str, db: Session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -303,29 +431,114 @@ async def get_current_doctor(
     except JWTError:
         raise credentials_exception
         
-    doctor = db.query(models.Doctor).filter(models.Doctor.email == email).first()
+    doctor = principal_cache.get("doctor", email)
+    if doctor is not None:
+        return doctor
+
+    doctor = await crud.get_doctor_by_email(db, email)
     if doctor is None:
         raise credentials_exception
-        
+
+    db.expunge(doctor)
+    principal_cache.put("doctor", email, doctor, payload.get("exp"))
     return doctor
 
+# Get current doctor helper function
+async def get_current_doctor(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+):
+    return await authenticate_doctor(token, db)
+
 # Protected doctor profile route
 @app.get("/doctors/me/", response_model=schemas.Doctor)
 async def read_doctor_profile(current_doctor: models.Doctor = Depends(get_current_doctor)):
     return current_doctor
 
+@app.get("/doctors/me/score-events")
+async def stream_score_events(request: Request, access_token: str):
+    """
+    Server-sent events stream with a "test_scored" event {patient_id, test_id, total_score}
+    whenever a test of one of the doctor's patients finishes scoring, so the dashboard
+    doesn't have to poll. Events come from the process-wide listener, not a query per stream.
+    EventSource can't set an Authorization header, so the token is passed in the query string;
+    the stream ends when it expires.
+    """
+    # A session of its own, closed before streaming, so open streams don't hold pool connections
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            doctor = await authenticate_doctor(access_token, db)
+    else:
+        db = SessionLocal()
+        try:
+            doctor = await authenticate_doctor(access_token, db)
+        finally:
+            db.close()
+    expires_at = jwt.get_unverified_claims(access_token).get("exp")
+
+    async def stream():
+        queue = score_events.hub.subscribe(doctor.email)
+        try:
+            while expires_at is None or time.time() < expires_at:
+                timeout = score_events.SCORE_EVENTS_KEEPALIVE_SECONDS
+                if expires_at is not None:
+                    timeout = min(timeout, expires_at - time.time())
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield score_events.format_event(event)
+        finally:
+            score_events.hub.unsubscribe(doctor.email, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # Keep proxies from caching the stream or holding events back in a buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def stream_patients_ndjson(doctor_email: str, batch_size: int = 500):
+    # Own session: the generator outlives the request's dependencies
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(models.Patient)
+            .filter(models.Patient.doctor_email == doctor_email)
+            .order_by(*PATIENT_ORDER)
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
+        )
+        for patient in query:
+            yield schemas.Patient.from_orm(patient).json() + "\n"
+    finally:
+        db.close()
+
+# Declared before /patients/{patient_id} so "export" isn't taken for a patient ID
+@app.get("/patients/export")
+def export_patients(current_doctor: models.Doctor = Depends(get_current_doctor)):
+    """
+    Stream the doctor's patients as newline-delimited JSON from a server-side cursor,
+    without building the full list in memory.
+    Only accessible by authenticated doctors.
+    """
+    return StreamingResponse(stream_patients_ndjson(current_doctor.email), media_type="application/x-ndjson")
+
 @app.get("/patients/{patient_id}", response_model=schemas.Patient)
 async def get_patient_by_id(
     patient_id: str,
     current_doctor: models.Doctor = Depends(get_current_doctor),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """
     Get patient data by patient ID.
     Only accessible by authenticated doctors.
     """
     try:
-        patient = db.query(models.Patient).filter(models.Patient.patient_id == patient_id).first()
+        patient = await crud.get_patient_by_id(db, patient_id)
         
         if patient is None:
             raise HTTPException(
@@ -341,3 +554,230 @@ async def get_patient_by_id(
             detail=f"Error fetching patient data: {str(e)}"
         )
 
+@app.get("/patients/{patient_id}/history", response_model=List[schemas.TestSummary])
+async def get_patient_history(
+    patient_id: str,
+    current_doctor: models.Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_session)
+):
+    """
+    Get a patient's MoCA test history: per-test totals and per-subtest scores.
+    Served from the precomputed summary table in a single indexed read.
+    Only accessible by authenticated doctors.
+    """
+    return await crud.get_test_history(db, patient_id)
+
+def submit_test_for_processing(test_id: str):
+    """
+    Hand a stored test to the processing service (runs as a background task).
+    It answers 202 once the test is queued and scores it in the background; when its queue is
+    full it answers 429, so wait for Retry-After and try again.
+    """
+    for attempt in range(PROCESSING_SUBMIT_ATTEMPTS):
+        request = urllib.request.Request(
+            f"{PROCESSING_URL}/receive-test-id/",
+            data=json.dumps({"test_id": test_id}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+                print(f"Submitted test {test_id} for processing ({response.status})")
+            return
+        except urllib.error.HTTPError as e:
+            if e.code != 429 or attempt == PROCESSING_SUBMIT_ATTEMPTS - 1:
+                print(f"Failed to submit test {test_id} for processing: {e}")
+                return
+            time.sleep(int(e.headers.get("Retry-After", "5")))
+        except Exception as e:
+            print(f"Failed to submit test {test_id} for processing: {e}")
+            return
+
+@app.post("/tests/", response_model=schemas.TestSubmissionResponse)
+def submit_test(
+    submission: schemas.TestSubmission,
+    background_tasks: BackgroundTasks,
+    current_user: models.Patient = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Store every subtest of a completed MoCA test in one request.
+    All rows go in with a single multi-row INSERT in one transaction, then the
+    test is handed to the processing service.
+    """
+    rows = [
+        {
+            "patient_id": current_user.patient_id,
+            "subtest_name": subtest.subtest_name,
+            "expected_responses": subtest.expected_responses,
+            "actual_responses": subtest.actual_responses,
+        }
+        for subtest in submission.subtests
+    ]
+    try:
+        # test_id is derived by test_id_trigger from the patient and the transaction's timestamp,
+        # so every row of the batch lands under the same test
+        result = db.execute(
+            insert(models.TestRecord)
+            .values(rows)
+            .returning(models.TestRecord.subtest_id, models.TestRecord.test_id)
+        )
+        inserted = result.all()
+        # Marks the test complete in the same transaction, so its test_scored event waits for
+        # every subtest above (a second test the same day shares the test_id)
+        db.execute(
+            pg_insert(models.SubmittedTest)
+            .values(test_id=inserted[0].test_id, patient_id=current_user.patient_id)
+            .on_conflict_do_nothing(index_elements=[models.SubmittedTest.test_id])
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to store test: {str(e)}"
+        )
+
+    test_id = inserted[0].test_id
+    background_tasks.add_task(submit_test_for_processing, test_id)
+
+    return schemas.TestSubmissionResponse(
+        success=True,
+        test_id=test_id,
+        subtest_ids=[row.subtest_id for row in inserted]
+    )
+
+# Picture URLs carry the content hash, so a URL's bytes never change and can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@app.get("/naming-questions/", response_model=List[schemas.NamingQuestionInfo])
+def get_naming_questions(db: Session = Depends(get_db)):
+    """
+    List naming questions without their picture bytes; fetch each picture from image_url.
+    """
+    questions = db.query(models.NamingQuestion).order_by(models.NamingQuestion.created_at).all()
+    return [
+        schemas.NamingQuestionInfo(
+            question_id=question.question_id,
+            answer=question.answer,
+            picture_type=question.picture_type,
+            image_url=f"/naming-questions/{question.question_id}/picture?v={question.picture_sha256}",
+            created_at=question.created_at,
+        )
+        for question in questions
+    ]
+
+@app.get("/naming-questions/{question_id}/picture")
+def get_naming_question_picture(
+    question_id: uuid.UUID,
+    request: Request,
+    v: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Serve a naming picture with a strong ETag derived from its content hash.
+    Hot pictures come from an in-memory LRU keyed by that hash: versioned URLs (?v=<sha256>, as
+    listed by /naming-questions/) name it directly, other requests only read the hash column.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    digest = v
+    if digest is None:
+        digest = (
+            db.query(models.NamingQuestion.picture_sha256)
+            .filter(models.NamingQuestion.question_id == question_id)
+            .scalar()
+        )
+        # Answer revalidations without pulling the blob out of the database
+        if digest and if_none_match == f'"{digest}"':
+            return Response(status_code=304, headers={"ETag": if_none_match, "Cache-Control": "no-cache"})
+
+    cached = image_cache.get(("naming", question_id, digest)) if digest else None
+    if cached is None:
+        question = (
+            db.query(models.NamingQuestion)
+            .options(load_only("picture_type", "picture_sha256"), undefer("picture"))
+            .filter(models.NamingQuestion.question_id == question_id)
+            .first()
+        )
+        if question is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Naming question not found")
+
+        current = question.picture_sha256 or hashlib.sha256(question.picture).hexdigest()
+        cached = (f'"{current}"', bytes(question.picture), question.picture_type)
+        image_cache.put(("naming", question_id, current), *cached)
+
+    etag, content, media_type = cached
+    # Only a URL naming the hash of the bytes it gets may be cached for good; a replaced
+    # picture's old ?v= URL and unversioned URLs revalidate instead
+    cache_control = IMMUTABLE_CACHE_CONTROL if v is not None and etag == f'"{v}"' else "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+@app.post("/images")
+def upload_image(
+    request: Request,
+    image: UploadFile = File(...),
+    current_user: models.Patient = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Store an uploaded drawing (PNG or JPEG, up to IMAGE_UPLOAD_MAX_BYTES) in the image store
+    and record its key. The upload is streamed to disk in chunks, never held in memory whole.
+    """
+    max_bytes = image_store.IMAGE_UPLOAD_MAX_BYTES
+    # Turned away before the body is read when the client says up front it is too big
+    if int(request.headers.get("content-length", 0)) > max_bytes + 64 * 1024:
+        raise HTTPException(status_code=413, detail=f"Image is larger than {max_bytes} bytes")
+
+    first = image.file.read(1024 * 1024)
+    # Judged by the bytes, not the client's content type; the store serves PNG and JPEG only
+    if image_store.media_type(first[:8]) == "application/octet-stream":
+        raise HTTPException(status_code=415, detail="Image must be a PNG or JPEG")
+
+    chunks = itertools.chain([first], iter(lambda: image.file.read(1024 * 1024), b""))
+    try:
+        key = image_store.put_stream(chunks, max_bytes)
+    except image_store.ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    db_image = models.Image(storage_key=key)
+    db.add(db_image)
+    db.commit()
+    db.refresh(db_image)
+    return {"success": True, "image_id": db_image.image_id}
+
+@app.get("/images/{image_id}")
+def get_image(
+    image_id: int,
+    request: Request,
+    current_doctor: models.Doctor = Depends(get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """
+    Serve a stored drawing without copying it through Python: via nginx X-Accel-Redirect when
+    IMAGE_STORE_ACCEL_PREFIX is set and the request came through nginx, otherwise as a
+    FileResponse. The key is the content hash, so it doubles as a strong ETag.
+    """
+    storage_key = db.query(models.Image.storage_key).filter(models.Image.image_id == image_id).scalar()
+
+    if storage_key:
+        headers = {"ETag": f'"{storage_key}"', "Cache-Control": "private, max-age=31536000, immutable"}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        # A client calling the API directly would get the empty redirect response instead of the file
+        if image_store.IMAGE_STORE_ACCEL_PREFIX and request.headers.get("x-image-store-accel") == "1":
+            headers["X-Accel-Redirect"] = image_store.IMAGE_STORE_ACCEL_PREFIX + image_store.relative_path(storage_key)
+            return Response(headers=headers)
+        path = image_store.path_for(storage_key)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Image {image_id} missing from store")
+        return FileResponse(path, media_type=image_store.media_type_of(storage_key), headers=headers)
+
+    # Rows not migrated to the store yet
+    image_data = (
+        db.query(models.Image.image_data).filter(models.Image.image_id == image_id).scalar()
+    )
+    if image_data is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    return Response(content=bytes(image_data), media_type=image_store.media_type(bytes(image_data[:8])))
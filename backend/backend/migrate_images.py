@@ -0,0 +1,63 @@
+"""
+Moves image blobs out of the images table into the content-addressed image store.
+
+Rows are streamed from a server-side cursor, written to the store and updated in batches
+with their storage_key. Already migrated rows are skipped, so the tool can be re-run after
+an interruption.
+
+image_data is kept by default: only pass --clear-blobs once every processing host reads the
+same store (IMAGE_STORE_ROOT, see processing/utils.py), since the copy in the store is then
+the only one. Run VACUUM FULL images afterwards to return the freed space to the operating
+system.
+
+Usage:
+    python migrate_images.py [--batch-size 100] [--clear-blobs]
+"""
+import argparse
+
+from sqlalchemy import text
+
+import image_store
+from database import engine
+
+SELECT_BLOBS = text("""
+    SELECT image_id, image_data FROM images
+    WHERE storage_key IS NULL AND image_data IS NOT NULL
+    ORDER BY image_id
+""")
+
+UPDATE_KEY = text("UPDATE images SET storage_key = :key WHERE image_id = :image_id")
+UPDATE_KEY_AND_CLEAR = text("UPDATE images SET storage_key = :key, image_data = NULL WHERE image_id = :image_id")
+
+
+def migrate(batch_size: int, clear_blobs: bool):
+    update = UPDATE_KEY_AND_CLEAR if clear_blobs else UPDATE_KEY
+    moved = stored_bytes = 0
+
+    with engine.connect() as reader:
+        result = reader.execution_options(stream_results=True, max_row_buffer=batch_size).execute(SELECT_BLOBS)
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            params = [{"image_id": image_id, "key": image_store.put(bytes(data))} for image_id, data in rows]
+            with engine.begin() as writer:
+                writer.execute(update, params)
+            moved += len(rows)
+            stored_bytes += sum(len(data) for _, data in rows)
+            print(f"Moved {moved} images ({stored_bytes / 1e6:.1f} MB) to {image_store.IMAGE_STORE_ROOT}")
+
+    print(f"Done: {moved} images migrated.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--clear-blobs", action="store_true",
+                        help="Set image_data to NULL after copying (processing must read the store).")
+    args = parser.parse_args()
+    migrate(args.batch_size, args.clear_blobs)
+
+
+if __name__ == "__main__":
+    main()
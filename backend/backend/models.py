@@ -1,7 +1,9 @@
-from sqlalchemy import Column, String, Integer, DateTime, text, LargeBinary
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, text, LargeBinary, Index, Text, Sequence, event, inspect
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from database import Base
+import hashlib
 import uuid
 
 
@@ -9,6 +11,8 @@ class Patient(Base):
     __tablename__ = "patients"
 
     patient_id = Column(String(6), primary_key=True, server_default=text("generate_short_id()"))
+    # Email of the doctor the patient is under (see /patients/export and score events)
+    doctor_email = Column(String(255))
     first_name = Column(String(50), nullable=False)
     last_name = Column(String(50), nullable=False)
     email = Column(String(255), unique=True, nullable=False)
@@ -19,16 +23,28 @@ class Patient(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Keyset pagination order for GET /patients/
+    __table_args__ = (Index("idx_patients_created_at_id", "created_at", "patient_id"),)
+
 class NamingQuestion(Base):
     __tablename__ = "naming_questions"
 
     question_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    picture = Column(LargeBinary, nullable=False)
+    # Picture bytes are only loaded when explicitly requested (see /naming-questions/{id}/picture)
+    picture = deferred(Column(LargeBinary, nullable=False))
+    picture_sha256 = Column(String(64))
     picture_type = Column(String(50), nullable=False)
     answer = Column(String(100), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+@event.listens_for(NamingQuestion, "before_insert")
+@event.listens_for(NamingQuestion, "before_update")
+def set_picture_hash(mapper, connection, target):
+    # Only hash when the picture was set in this flush; an unloaded deferred picture stays unloaded
+    if inspect(target).attrs.picture.history.has_changes():
+        target.picture_sha256 = hashlib.sha256(target.picture).hexdigest()
+
 class Doctor(Base):
     __tablename__ = "doctors"
     
@@ -39,4 +55,59 @@ class Doctor(Base):
     password_hash = Column(String(255), nullable=False)
     phone = Column(String(20))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class TestRecord(Base):
+    """
+    One subtest of a MoCA test; test_id is filled in by the test_id_trigger.
+    The table is partitioned by month on timestamp, which is therefore part of the primary key.
+    """
+    __tablename__ = "test_records"
+
+    patient_id = Column(String(255), nullable=False)
+    test_id = Column(String(255))
+    subtest_id = Column(Integer, Sequence("test_records_subtest_seq"), primary_key=True)
+    subtest_name = Column(String(255), nullable=False)
+    expected_responses = Column(ARRAY(Text))
+    actual_responses = Column(ARRAY(Text))
+    timestamp = Column(DateTime, primary_key=True, server_default=func.now())
+    extracted_responses = Column(ARRAY(Text))
+    score = Column(ARRAY(Integer))
+    aggregated_score = Column(Integer)
+    scorer_version = Column(String(32))
+
+    # Processing looks up a test's subtest; dashboards list a patient's records by date
+    __table_args__ = (
+        Index("idx_test_records_test_subtest", "test_id", "subtest_name"),
+        Index("idx_test_records_patient_timestamp", "patient_id", timestamp.desc()),
+    )
+
+class SubmittedTest(Base):
+    """A test stored by POST /tests/; test_scored events are only sent for these."""
+    __tablename__ = "submitted_tests"
+
+    test_id = Column(String(255), primary_key=True)
+    patient_id = Column(String(255), nullable=False)
+    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Image(Base):
+    """Uploaded drawing; the bytes live in the on-disk image store under storage_key."""
+    __tablename__ = "images"
+
+    image_id = Column(Integer, primary_key=True)
+    storage_key = Column(String(64))
+    # Legacy blob, only set on rows not moved by migrate_images.py yet
+    image_data = deferred(Column(LargeBinary))
+
+class TestSummary(Base):
+    """Per-test MoCA totals, kept up to date by a trigger on test_records."""
+    __tablename__ = "moca_test_summary"
+
+    patient_id = Column(String(255), primary_key=True)
+    test_id = Column(String(255), primary_key=True)
+    test_date = Column(DateTime, nullable=False)
+    subtest_scores = Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))
+    total_score = Column(Integer, nullable=False, server_default=text("0"))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("idx_moca_test_summary_patient_date", "patient_id", test_date.desc()),)
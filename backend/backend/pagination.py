@@ -0,0 +1,26 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException, status
+
+# Keyset cursors are opaque to clients: base64url-encoded JSON of the sort key of the
+# last row on the page, here (created_at, patient_id)
+
+
+def encode_cursor(created_at: datetime, patient_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), patient_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, patient_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), patient_id
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
@@ -0,0 +1,33 @@
+import asyncio
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from database import engine
+
+# test_records is partitioned by month (migration 006); partitions are created this many
+# months ahead so inserts never land in the default partition
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_CHECK_INTERVAL_SECONDS = int(os.getenv("PARTITION_CHECK_INTERVAL_SECONDS", str(24 * 60 * 60)))
+
+
+def ensure_partitions() -> int:
+    """Create any missing upcoming test_records partitions; returns how many were created."""
+    with engine.begin() as connection:
+        return connection.execute(
+            text("SELECT ensure_test_records_partitions(CURRENT_TIMESTAMP::timestamp, :months_ahead)"),
+            {"months_ahead": PARTITION_MONTHS_AHEAD},
+        ).scalar()
+
+
+async def maintain_partitions():
+    """Run ensure_partitions now and then once per interval until cancelled."""
+    while True:
+        try:
+            created = await run_in_threadpool(ensure_partitions)
+            if created:
+                print(f"Created {created} test_records partition(s)")
+        except Exception as e:
+            print(f"Partition maintenance failed: {e}")
+        await asyncio.sleep(PARTITION_CHECK_INTERVAL_SECONDS)
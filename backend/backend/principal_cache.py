@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+
+import models
+
+# Authenticated users resolved from a JWT are cached for a short while, so polling
+# clients don't cost a DB round-trip per request just to reload the same row
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+class PrincipalCache:
+    """LRU cache of resolved users keyed by (role, token subject)."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, role: str, subject: str):
+        key = (role, subject)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, role: str, subject: str, principal, token_expiry: float = None):
+        """Cache a principal until the TTL passes or the token it was loaded for expires."""
+        expires_at = time.time() + self.ttl_seconds
+        if token_expiry is not None:
+            expires_at = min(expires_at, token_expiry)
+        with self._lock:
+            self._entries[(role, subject)] = (principal, expires_at)
+            self._entries.move_to_end((role, subject))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, role: str, subject: str):
+        with self._lock:
+            if self._entries.pop((role, subject), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+# Drop cached principals whenever the underlying profile is updated or deleted through the ORM,
+# under both the old and the new email if the email itself changed
+def _invalidator(role: str):
+    def invalidate(mapper, connection, target):
+        history = inspect(target).attrs.email.history
+        for email in set(history.deleted or ()) | {target.email}:
+            principal_cache.invalidate(role, email)
+    return invalidate
+
+
+for _model, _role in ((models.Patient, "patient"), (models.Doctor, "doctor")):
+    event.listen(_model, "after_update", _invalidator(_role))
+    event.listen(_model, "after_delete", _invalidator(_role))
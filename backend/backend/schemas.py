@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, validator
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Union
 from uuid import UUID
 
 # Doctor Schemas
@@ -90,3 +90,69 @@ class LoginResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
 
+class TestSummary(BaseModel):
+    test_id: str
+    test_date: datetime
+    subtest_scores: Dict[str, int]
+    total_score: int
+    updated_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+# Subtest names understood by the processing service
+SUBTEST_NAMES = {
+    "naming", "memory", "attention_fs", "attention_bs", "attention_ss", "sentence_repetition",
+    "verbal_fluency", "orientation", "delayed_recall", "trail_making", "cdt",
+}
+
+# Responses are stored in TEXT[] columns: either a flat list of strings or a list of
+# equally long lists (e.g. one list per memory trial)
+Responses = List[Union[List[str], str]]
+
+def _check_rectangular(responses):
+    if responses and any(isinstance(item, list) for item in responses):
+        if not all(isinstance(item, list) for item in responses):
+            raise ValueError("responses must be all strings or all lists")
+        if len({len(item) for item in responses}) > 1:
+            raise ValueError("nested response lists must all have the same length")
+    return responses
+
+class SubtestSubmission(BaseModel):
+    subtest_name: str
+    expected_responses: Optional[Responses] = None
+    actual_responses: Responses = []
+
+    @validator("subtest_name")
+    def known_subtest(cls, value):
+        if value not in SUBTEST_NAMES:
+            raise ValueError(f"unknown subtest: {value}")
+        return value
+
+    _rectangular_expected = validator("expected_responses", allow_reuse=True)(_check_rectangular)
+    _rectangular_actual = validator("actual_responses", allow_reuse=True)(_check_rectangular)
+
+class TestSubmission(BaseModel):
+    subtests: List[SubtestSubmission]
+
+    @validator("subtests")
+    def one_row_per_subtest(cls, value):
+        if not value:
+            raise ValueError("a test needs at least one subtest")
+        names = [subtest.subtest_name for subtest in value]
+        if len(names) != len(set(names)):
+            raise ValueError("each subtest may only be submitted once")
+        return value
+
+class TestSubmissionResponse(BaseModel):
+    success: bool
+    test_id: str
+    subtest_ids: List[int]
+
+class NamingQuestionInfo(BaseModel):
+    question_id: UUID
+    answer: str
+    picture_type: str
+    image_url: str
+    created_at: Optional[datetime]
+
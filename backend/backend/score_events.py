@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from database import DATABASE_URL
+
+# Push "test scored" events to doctors' dashboards (GET /doctors/me/score-events) from the
+# notifications of database/migrations/008_test_scored_notify.sql
+SCORE_EVENTS_LISTEN = os.getenv("SCORE_EVENTS_LISTEN", "1") == "1"
+# Events buffered per open stream; a client that falls further behind loses the oldest ones
+SCORE_EVENTS_QUEUE_SIZE = int(os.getenv("SCORE_EVENTS_QUEUE_SIZE", "100"))
+# Comment lines sent on idle streams so proxies don't time them out and closed ones are noticed
+SCORE_EVENTS_KEEPALIVE_SECONDS = float(os.getenv("SCORE_EVENTS_KEEPALIVE_SECONDS", "15"))
+NOTIFY_CHANNEL = "test_scored"
+RECONNECT_SECONDS = 5
+
+
+class ScoreEventHub:
+    """
+    Fans the process's one stream of test_scored notifications out to the open dashboard
+    streams, keyed by doctor email. Lives on the event loop, so it needs no locking.
+    """
+
+    def __init__(self, queue_size: int = SCORE_EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self.notifications = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, doctor_email: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(doctor_email, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, doctor_email: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(doctor_email)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[doctor_email]
+
+    def publish(self, doctor_email: str, event: dict):
+        self.notifications += 1
+        for queue in self._subscribers.get(doctor_email, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+            self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "doctors": len(self._subscribers),
+            "streams": sum(len(queues) for queues in self._subscribers.values()),
+            "notifications": self.notifications,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+hub = ScoreEventHub()
+
+
+def format_event(event: dict) -> str:
+    """One server-sent event as written to the stream."""
+    return f"event: test_scored\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+def connect(channel: str):
+    """The blocking part of listen(): an autocommit connection that has run LISTEN channel."""
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {channel}")
+    except Exception:
+        connection.close()
+        raise
+    return connection
+
+
+async def listen(hub: ScoreEventHub = hub, channel: str = NOTIFY_CHANNEL):
+    """
+    Publishes each test_scored notification to the hub, however many streams are open, from a
+    single LISTEN connection outside the engine's pool. The connect runs in the default executor
+    so a database that is down doesn't stall the API; while it is down no events are pushed,
+    and dashboards pick those tests up on their next fetch.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        connection = None
+        try:
+            connection = await loop.run_in_executor(None, connect, channel)
+            print(f"Listening for {channel} notifications.")
+
+            readable = asyncio.Event()
+            loop.add_reader(connection.fileno(), readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        try:
+                            payload = json.loads(notification.payload)
+                            # The doctor's email only routes the event; it isn't sent on
+                            hub.publish(payload["doctor_email"], {
+                                "patient_id": payload["patient_id"],
+                                "test_id": payload["test_id"],
+                                "total_score": payload["total_score"],
+                            })
+                        except (ValueError, KeyError) as e:
+                            print(f"Ignoring malformed notification {notification.payload!r}: {e}")
+            finally:
+                loop.remove_reader(connection.fileno())
+        except (psycopg2.Error, OSError) as e:
+            print(f"Score event listener lost its connection: {e}")
+        finally:
+            if connection is not None:
+                connection.close()
+        await asyncio.sleep(RECONNECT_SECONDS)
@@ -48,10 +48,7 @@ CREATE TABLE IF NOT EXISTS public.patients (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-<<<<<<< HEAD
-
-=======
-CREATE TABLE test_records (
+CREATE TABLE IF NOT EXISTS public.test_records (
     patient_id VARCHAR(255) NOT NULL, 
     test_id VARCHAR(255),
     subtest_id INT PRIMARY KEY GENERATED ALWAYS AS IDENTITY, 
@@ -63,7 +60,6 @@ CREATE TABLE test_records (
     score INT[], 
     aggregated_score INT
 );
->>>>>>> fde257e1c9e799d266deb766194699c6ece7c0c7
 
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_patients_email ON public.patients(email);
@@ -0,0 +1,7 @@
+-- Tag every stored score with the version of the scorer that produced it,
+-- so processing/rescore.py can find rows scored under older rules.
+ALTER TABLE public.test_records ADD COLUMN IF NOT EXISTS scorer_version VARCHAR(32);
+
+-- Rescoring scans one subtest at a time for rows whose version is out of date
+CREATE INDEX IF NOT EXISTS idx_test_records_subtest_version
+    ON public.test_records(subtest_name, scorer_version);
@@ -0,0 +1,3 @@
+-- Stable keyset pagination for GET /patients/ orders by (created_at, patient_id)
+CREATE INDEX IF NOT EXISTS idx_patients_created_at_id
+    ON public.patients(created_at, patient_id);
@@ -0,0 +1,61 @@
+-- Per-test MoCA history, maintained incrementally whenever processing writes a subtest
+-- score, so the dashboard reads a patient's full history with one indexed query
+CREATE TABLE IF NOT EXISTS public.moca_test_summary (
+    patient_id VARCHAR(255) NOT NULL,
+    test_id VARCHAR(255) NOT NULL,
+    test_date TIMESTAMP NOT NULL,
+    subtest_scores JSONB NOT NULL DEFAULT '{}'::jsonb,
+    total_score INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (patient_id, test_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_moca_test_summary_patient_date
+    ON public.moca_test_summary(patient_id, test_date DESC);
+
+-- Fold one subtest's aggregated_score into its test's summary row. The total is
+-- adjusted by the difference to the previous score, so rescoring keeps it correct.
+CREATE OR REPLACE FUNCTION update_moca_test_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.aggregated_score IS NULL OR NEW.test_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO public.moca_test_summary AS s (patient_id, test_id, test_date, subtest_scores, total_score)
+    VALUES (
+        NEW.patient_id,
+        NEW.test_id,
+        NEW.timestamp,
+        jsonb_build_object(NEW.subtest_name, NEW.aggregated_score),
+        NEW.aggregated_score
+    )
+    ON CONFLICT (patient_id, test_id) DO UPDATE
+    SET subtest_scores = s.subtest_scores || EXCLUDED.subtest_scores,
+        total_score = s.total_score
+            - COALESCE((s.subtest_scores ->> NEW.subtest_name)::int, 0)
+            + NEW.aggregated_score,
+        test_date = LEAST(s.test_date, EXCLUDED.test_date),
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS moca_test_summary_trigger ON public.test_records;
+CREATE TRIGGER moca_test_summary_trigger
+    AFTER INSERT OR UPDATE OF aggregated_score ON public.test_records
+    FOR EACH ROW
+    EXECUTE FUNCTION update_moca_test_summary();
+
+-- Seed the summary from scores written before this migration (latest row per subtest)
+INSERT INTO public.moca_test_summary (patient_id, test_id, test_date, subtest_scores, total_score)
+SELECT patient_id, test_id, MIN(timestamp), jsonb_object_agg(subtest_name, aggregated_score), SUM(aggregated_score)
+FROM (
+    SELECT DISTINCT ON (test_id, subtest_name) patient_id, test_id, subtest_name, timestamp, aggregated_score
+    FROM public.test_records
+    WHERE aggregated_score IS NOT NULL AND test_id IS NOT NULL
+    ORDER BY test_id, subtest_name, subtest_id DESC
+) latest
+GROUP BY patient_id, test_id
+ON CONFLICT (patient_id, test_id) DO NOTHING;
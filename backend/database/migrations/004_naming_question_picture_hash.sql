@@ -0,0 +1,12 @@
+-- Content hash of each naming picture, used as its ETag and cache-busting URL version.
+-- naming_questions is created by the API's create_all, so it may not exist yet.
+ALTER TABLE IF EXISTS public.naming_questions ADD COLUMN IF NOT EXISTS picture_sha256 VARCHAR(64);
+
+DO $$
+BEGIN
+    IF to_regclass('public.naming_questions') IS NOT NULL THEN
+        UPDATE public.naming_questions
+        SET picture_sha256 = encode(digest(picture, 'sha256'), 'hex')
+        WHERE picture_sha256 IS NULL;
+    END IF;
+END $$;
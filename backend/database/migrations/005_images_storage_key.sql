@@ -0,0 +1,5 @@
+-- Images move to the content-addressed store on disk; Postgres only keeps the key.
+-- image_data stays for rows not migrated yet (see backend/migrate_images.py).
+-- The images table is created by the API's create_all, so it may not exist yet.
+ALTER TABLE IF EXISTS public.images ADD COLUMN IF NOT EXISTS storage_key VARCHAR(64);
+ALTER TABLE IF EXISTS public.images ALTER COLUMN image_data DROP NOT NULL;
@@ -0,0 +1,112 @@
+-- Partition test_records by month on timestamp and index the real query shapes:
+--   processing looks rows up by (test_id, subtest_name), dashboards by (patient_id, timestamp).
+-- idx_test_records on subtest_id duplicated the primary key and is dropped.
+
+-- Creates the monthly partitions from from_month up to months_ahead months past the current one.
+-- Called by the backend at startup and daily (backend/partitions.py), so inserts never fall
+-- through to the default partition.
+CREATE OR REPLACE FUNCTION ensure_test_records_partitions(
+    from_month TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    months_ahead INT DEFAULT 3
+)
+RETURNS INT AS $$
+DECLARE
+    month_start TIMESTAMP := date_trunc('month', from_month);
+    last_month TIMESTAMP := date_trunc('month', CURRENT_TIMESTAMP) + make_interval(months => months_ahead);
+    partition_name TEXT;
+    created INT := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        partition_name := 'test_records_' || TO_CHAR(month_start, 'YYYY_MM');
+        IF to_regclass('public.' || partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE public.%I PARTITION OF public.test_records FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_start + INTERVAL '1 month'
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    first_month TIMESTAMP;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'public.test_records'::regclass) = 'p' THEN
+        RETURN;  -- Already partitioned
+    END IF;
+
+    ALTER TABLE public.test_records RENAME TO test_records_unpartitioned;
+    -- Frees the name for the new table's primary key
+    ALTER INDEX IF EXISTS public.test_records_pkey RENAME TO test_records_unpartitioned_pkey;
+
+    -- Identity columns aren't supported on partitioned tables here, so ids come from a sequence.
+    -- The primary key has to include the partition key.
+    CREATE SEQUENCE IF NOT EXISTS public.test_records_subtest_seq;
+    PERFORM setval(
+        'public.test_records_subtest_seq',
+        COALESCE((SELECT MAX(subtest_id) FROM public.test_records_unpartitioned), 0) + 1,
+        false
+    );
+
+    CREATE TABLE public.test_records (
+        patient_id VARCHAR(255) NOT NULL,
+        test_id VARCHAR(255),
+        subtest_id INT NOT NULL DEFAULT nextval('public.test_records_subtest_seq'),
+        subtest_name VARCHAR(255) NOT NULL,
+        expected_responses TEXT[],
+        actual_responses TEXT[],
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        extracted_responses TEXT[],
+        score INT[],
+        aggregated_score INT,
+        scorer_version VARCHAR(32),
+        PRIMARY KEY (subtest_id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+
+    ALTER SEQUENCE public.test_records_subtest_seq OWNED BY public.test_records.subtest_id;
+
+    -- Catches rows outside the maintained range instead of failing the insert
+    CREATE TABLE public.test_records_default PARTITION OF public.test_records DEFAULT;
+
+    SELECT date_trunc('month', MIN(timestamp)) INTO first_month FROM public.test_records_unpartitioned;
+    PERFORM ensure_test_records_partitions(COALESCE(first_month, CURRENT_TIMESTAMP)::timestamp);
+
+    -- Copied before the triggers exist, so test_id and the MoCA summaries are left as they are
+    INSERT INTO public.test_records (
+        patient_id, test_id, subtest_id, subtest_name, expected_responses, actual_responses,
+        timestamp, extracted_responses, score, aggregated_score, scorer_version
+    )
+    SELECT patient_id, test_id, subtest_id, subtest_name, expected_responses, actual_responses,
+           COALESCE(timestamp, CURRENT_TIMESTAMP), extracted_responses, score, aggregated_score, scorer_version
+    FROM public.test_records_unpartitioned;
+
+    DROP TABLE public.test_records_unpartitioned;
+END;
+$$;
+
+DROP INDEX IF EXISTS public.idx_test_records;
+
+-- Indexes on the parent are created on every partition, current and future
+CREATE INDEX IF NOT EXISTS idx_test_records_test_subtest
+    ON public.test_records(test_id, subtest_name);
+CREATE INDEX IF NOT EXISTS idx_test_records_patient_timestamp
+    ON public.test_records(patient_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_test_records_subtest_version
+    ON public.test_records(subtest_name, scorer_version);
+
+-- Triggers from init.sql and 003 went away with the old table
+DROP TRIGGER IF EXISTS test_id_trigger ON public.test_records;
+CREATE TRIGGER test_id_trigger
+    BEFORE INSERT ON public.test_records
+    FOR EACH ROW
+    EXECUTE FUNCTION set_test_id();
+
+DROP TRIGGER IF EXISTS moca_test_summary_trigger ON public.test_records;
+CREATE TRIGGER moca_test_summary_trigger
+    AFTER INSERT OR UPDATE OF aggregated_score ON public.test_records
+    FOR EACH ROW
+    EXECUTE FUNCTION update_moca_test_summary();
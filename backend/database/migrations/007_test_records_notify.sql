@@ -0,0 +1,26 @@
+-- Announce every new test_records row on the test_record_inserted channel, so the processing
+-- service (processing/listener.py) can score each subtest as soon as it is stored instead of
+-- waiting for the whole test to be submitted. Notifications are delivered on commit, when the
+-- row is visible to the scorer.
+CREATE OR REPLACE FUNCTION notify_test_record_inserted()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify(
+        'test_record_inserted',
+        json_build_object(
+            'test_id', NEW.test_id,
+            'subtest_id', NEW.subtest_id,
+            'subtest_name', NEW.subtest_name
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- AFTER, so test_id has been filled in by test_id_trigger; created on the partitioned parent,
+-- it fires for rows in every partition
+DROP TRIGGER IF EXISTS test_record_notify_trigger ON public.test_records;
+CREATE TRIGGER test_record_notify_trigger
+    AFTER INSERT ON public.test_records
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_test_record_inserted();
@@ -0,0 +1,95 @@
+-- Announce on the test_scored channel when the last unscored subtest of a submitted test gets
+-- its aggregated_score or is flagged unscorable (and again when a scored test is rescored), so
+-- the API can push the result to the patient's doctor (backend/score_events.py) instead of
+-- dashboards polling for it.
+-- The payload carries the doctor's email so the API routes it without a query per event.
+
+-- POST /tests/ stores a test's subtests and its row here in one transaction, so once a test is
+-- listed every subtest it was submitted with is in test_records. Rows not submitted that way
+-- (or still arriving one at a time) are scored as usual but announce nothing, rather than a
+-- partial total.
+CREATE TABLE IF NOT EXISTS public.submitted_tests (
+    test_id VARCHAR(255) PRIMARY KEY,
+    patient_id VARCHAR(255) NOT NULL,
+    submitted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tests stored before this migration are complete, so their rescores are announced too
+INSERT INTO public.submitted_tests (test_id, patient_id)
+SELECT DISTINCT test_id, patient_id
+FROM public.test_records
+WHERE test_id IS NOT NULL
+ON CONFLICT (test_id) DO NOTHING;
+
+-- Subtests processing writes a score for: SPEECH_SCORERS in processing/speech_processing.py
+-- plus the clock drawing (cdt/cdt.py). Others, such as delayed_recall, are stored unscored and
+-- must not hold the event back; keep this in step when a scorer is added.
+CREATE OR REPLACE FUNCTION scored_subtests()
+RETURNS TEXT[] AS $$
+    SELECT ARRAY[
+        'naming', 'memory', 'attention_fs', 'attention_bs', 'attention_ss',
+        'sentence_repetition', 'verbal_fluency', 'orientation', 'cdt'
+    ]::TEXT[];
+$$ LANGUAGE sql IMMUTABLE;
+
+-- A subtest is settled once it has a score, or processing flagged it unscorable (a clock
+-- drawing turned away by triage keeps a NULL score with extracted_responses {unscorable,reason})
+CREATE OR REPLACE FUNCTION subtest_settled(aggregated_score INT, extracted_responses TEXT[])
+RETURNS BOOLEAN AS $$
+    SELECT aggregated_score IS NOT NULL OR COALESCE(extracted_responses[1] = 'unscorable', FALSE);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION notify_test_scored()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_doctor_email VARCHAR(255);
+    v_total_score INT;
+BEGIN
+    IF NEW.test_id IS NULL OR NOT subtest_settled(NEW.aggregated_score, NEW.extracted_responses)
+       OR (NEW.aggregated_score IS NOT DISTINCT FROM OLD.aggregated_score
+           AND subtest_settled(OLD.aggregated_score, OLD.extracted_responses)) THEN
+        RETURN NULL;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM public.submitted_tests WHERE test_id = NEW.test_id) THEN
+        RETURN NULL;
+    END IF;
+
+    -- Subtests of one test written in a single statement are all visible here, so only the
+    -- rows finishing the test's scored subtests get past this
+    IF EXISTS (
+        SELECT 1 FROM public.test_records
+        WHERE test_id = NEW.test_id AND subtest_name = ANY(scored_subtests())
+          AND NOT subtest_settled(aggregated_score, extracted_responses)
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT doctor_email INTO v_doctor_email FROM public.patients WHERE patient_id = NEW.patient_id;
+    IF v_doctor_email IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- moca_test_summary_trigger sorts (and so fires) before this one, so the total is current
+    SELECT total_score INTO v_total_score
+    FROM public.moca_test_summary
+    WHERE patient_id = NEW.patient_id AND test_id = NEW.test_id;
+
+    PERFORM pg_notify(
+        'test_scored',
+        json_build_object(
+            'doctor_email', v_doctor_email,
+            'patient_id', NEW.patient_id,
+            'test_id', NEW.test_id,
+            'total_score', v_total_score
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS test_scored_notify_trigger ON public.test_records;
+CREATE TRIGGER test_scored_notify_trigger
+    AFTER UPDATE OF aggregated_score ON public.test_records
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_test_scored();
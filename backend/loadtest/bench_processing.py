@@ -0,0 +1,267 @@
+"""
+End-to-end benchmark of the processing service: from POST /receive-test-id/ to every
+test_records row of the test having score and aggregated_score.
+
+Each synthetic test gets its own patient, eight speech subtests with slightly noisy
+transcripts and a rendered clock drawing for the cdt subtest. Submissions are fired open-loop
+at --rate tests per minute, and completion is detected by polling test_records.
+
+For the per-stage breakdown, start the processing service with PROCESSING_TIMINGS_FILE set
+(see processing/utils.py) and pass the same path as --timings-file. Queue wait is the time
+from the service accepting the test until it gets a processing slot, start-up is the time
+from dispatching a scoring script until its imports are done, and fetch/score/write are
+timed per subtest. Submissions the service turns away with 429 are counted separately.
+
+Usage:
+    python bench_processing.py [--tests 20] [--rate 6] [--processing-url http://localhost:5433]
+                               [--database-url postgresql://...] [--timings-file timings.jsonl]
+                               [--image-store-root /var/lib/parkinsons/images] [--timeout 600]
+                               [--output report.json]
+
+Seeded rows are tagged like seed.py's (loadtest+<tag>-bench...), so seed.py --reset --tag <tag>
+removes them.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, text
+
+from run import percentile
+from seed import DEFAULT_DATABASE_URL, PASSWORD, short_id
+from synthetic import render_clock, transcript_responses
+
+SUBTEST_COUNT = 9  # Eight speech subtests and the clock drawing
+
+COMPLETION_QUERY = text("""
+    SELECT test_id, COUNT(*) FILTER (WHERE score IS NOT NULL AND aggregated_score IS NOT NULL)
+    FROM test_records
+    WHERE test_id = ANY(:test_ids)
+    GROUP BY test_id
+""")
+
+
+def open_image_store(root: str):
+    # Same layout as the API's image store, for a processing service that reads from it
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+    import image_store
+    image_store.IMAGE_STORE_ROOT = root
+    return image_store
+
+
+def store_image(connection, image: bytes, image_store):
+    if image_store is not None:
+        return connection.execute(text("INSERT INTO images (storage_key) VALUES (:key) RETURNING image_id"),
+                                  {"key": image_store.put(image)}).scalar()
+    return connection.execute(text("INSERT INTO images (image_data) VALUES (:data) RETURNING image_id"),
+                              {"data": image}).scalar()
+
+
+def create_tests(engine, args):
+    """Inserts one complete, unscored test per synthetic patient; returns their test_ids."""
+    rng = random.Random(args.seed)
+    password_hash = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+    image_store = open_image_store(args.image_store_root) if args.image_store_root else None
+    run_id = int(time.time())
+    taken = set()
+    patient_ids = []
+    records = []
+
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        for i in range(args.tests):
+            patient_id = short_id(taken)
+            patient_ids.append(patient_id)
+            connection.execute(text("""
+                INSERT INTO patients (patient_id, first_name, last_name, email, age, gender, phone, password_hash)
+                VALUES (:patient_id, 'Bench', :last_name, :email, 70, 'other', '5550000000', :password_hash)
+            """), {"patient_id": patient_id, "last_name": f"Patient{i}",
+                   "email": f"loadtest+{args.tag}-bench{run_id}-{i}@example.com", "password_hash": password_hash})
+
+            image_id = store_image(connection, render_clock(rng), image_store)
+            records.extend(
+                {"patient_id": patient_id, "subtest_name": name, "expected": expected, "actual": actual}
+                for name, expected, actual in transcript_responses(rng)
+            )
+            records.append({"patient_id": patient_id, "subtest_name": "cdt", "expected": [], "actual": [str(image_id)]})
+
+        connection.execute(text("""
+            INSERT INTO test_records (patient_id, subtest_name, expected_responses, actual_responses)
+            VALUES (:patient_id, :subtest_name, :expected, :actual)
+        """), records)
+
+        # Every row shares the transaction's timestamp, so each patient has exactly one test_id
+        test_ids = connection.execute(
+            text("SELECT DISTINCT test_id FROM test_records WHERE patient_id = ANY(:patient_ids)"),
+            {"patient_ids": patient_ids},
+        ).scalars().all()
+    print(f"Created {len(test_ids)} synthetic tests in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return test_ids
+
+
+def submit(processing_url: str, test_id: str):
+    body = json.dumps({"test_id": test_id}).encode()
+    request = urllib.request.Request(f"{processing_url}/receive-test-id/", data=body,
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=3600) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def fire_submissions(test_ids, args):
+    """Submits test_ids open-loop at args.rate per minute; returns {test_id: (sent, status)}."""
+    submitted = {}
+    lock = threading.Lock()
+
+    def send(test_id):
+        sent = time.time()
+        status = submit(args.processing_url, test_id)
+        with lock:
+            submitted[test_id] = (sent, status)
+
+    interval = 60.0 / args.rate
+    start = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=len(test_ids))
+    for i, test_id in enumerate(test_ids):
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(send, test_id)
+    return pool, submitted
+
+
+def wait_for_completion(engine, test_ids, deadline: float, poll_interval: float, completed: dict):
+    """Polls test_records until every test is fully scored, filling {test_id: completed_at}."""
+    pending = set(test_ids)
+    while pending and time.time() < deadline:
+        with engine.connect() as connection:
+            for test_id, scored in connection.execute(COMPLETION_QUERY, {"test_ids": list(pending)}):
+                if scored >= SUBTEST_COUNT:
+                    completed[test_id] = time.time()
+                    pending.discard(test_id)
+        time.sleep(poll_interval)
+
+
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 0.50), 3),
+        "p95": round(percentile(values, 0.95), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "max": round(values[-1], 3),
+        "mean": round(sum(values) / len(values), 3),
+    }
+
+
+def stage_breakdown(timings_file: str, submitted: dict):
+    """Per-stage durations in seconds from the processing service's timing lines."""
+    events = defaultdict(list)
+    with open(timings_file) as f:
+        for line in f:
+            event = json.loads(line)
+            if event["test_id"] in submitted:
+                events[event["test_id"]].append(event)
+
+    accept_delay, queue_wait, startup = [], [], defaultdict(list)
+    per_subtest = defaultdict(lambda: defaultdict(list))
+    for test_id, test_events in events.items():
+        by_stage = {(event["subtest"], event["stage"]): event for event in test_events}
+        received = by_stage.get((None, "received"))
+        admitted = by_stage.get((None, "admitted"))
+        if received:
+            accept_delay.append(received["start"] - submitted[test_id][0])
+        if received and admitted:
+            queue_wait.append(admitted["start"] - received["start"])
+        for script, ready in (("speech_script", "speech_ready"), ("cdt_script", "cdt_ready")):
+            if (None, script) in by_stage and (None, ready) in by_stage:
+                startup[script].append(by_stage[(None, ready)]["start"] - by_stage[(None, script)]["start"])
+        for event in test_events:
+            if event["subtest"] is not None:
+                per_subtest[event["subtest"]][event["stage"]].append(event["end"] - event["start"])
+
+    return {
+        # From submission until the request handler ran, then waiting for an admission slot
+        "accept_delay_s": summarize(accept_delay),
+        "queue_wait_s": summarize(queue_wait),
+        "script_startup_s": {script: summarize(values) for script, values in startup.items()},
+        "subtests": {
+            subtest: {stage: summarize(values) for stage, values in stages.items()}
+            for subtest, stages in sorted(per_subtest.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=6, help="Submissions per minute.")
+    parser.add_argument("--processing-url", default=os.getenv("PROCESSING_URL", "http://localhost:5433"))
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--timings-file", help="The processing service's PROCESSING_TIMINGS_FILE.")
+    parser.add_argument("--image-store-root", help="Write clock drawings to this image store instead of bytea.")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for scores after the last submission.")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--tag", default="lt")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the report here instead of stdout.")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url, executemany_mode="values_plus_batch")
+    test_ids = create_tests(engine, args)
+
+    # Poll while submissions are still going out, so early completions are timed accurately
+    completed = {}
+    first_submit = time.time()
+    deadline = first_submit + len(test_ids) * 60.0 / args.rate + args.timeout
+    poller = threading.Thread(target=wait_for_completion,
+                              args=(engine, test_ids, deadline, args.poll_interval, completed))
+    poller.start()
+    pool, submitted = fire_submissions(test_ids, args)
+    poller.join()
+    pool.shutdown(wait=True)
+
+    end_to_end = [completed[test_id] - submitted[test_id][0] for test_id in completed if test_id in submitted]
+    window = (max(completed.values()) - first_submit) if completed else 0
+    http_errors = sum(1 for _, status in submitted.values() if status not in (200, 202, 429))
+    rejected = sum(1 for _, status in submitted.values() if status == 429)
+
+    report = {
+        "tests": len(test_ids),
+        "target_rate_per_min": args.rate,
+        "completed": len(completed),
+        "incomplete": len(test_ids) - len(completed),
+        "submission_errors": http_errors,
+        "rejected_429": rejected,
+        "sustained_tests_per_min": round(len(completed) / window * 60, 2) if window else 0.0,
+        "end_to_end_s": summarize(end_to_end),
+    }
+    if args.timings_file:
+        report["stages"] = stage_breakdown(args.timings_file, submitted)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
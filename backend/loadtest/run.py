@@ -0,0 +1,228 @@
+"""
+Drives a weighted mix of API routes at a target request rate and reports per-route results.
+
+Requests are scheduled open-loop: request i is due at start + i / rps whatever happened to
+earlier ones, and latency is measured from that due time, so a stalled server shows up as
+latency instead of silently lowering the offered load.
+
+Routes (name: request):
+    signup          POST /signup/ with a new patient
+    login           POST /login/ as a seeded patient
+    doctor_login    POST /doctors/login/ as a seeded doctor
+    profile         GET /profile/ with a patient token
+    patients        GET /patients/?limit=50
+    patient         GET /patients/{patient_id} with a doctor token
+    history         GET /patients/{patient_id}/history
+
+Usage:
+    python run.py [--base-url http://localhost:8000] [--manifest loadtest_manifest.json]
+                  [--mix profile=5,patients=2,patient=5,login=1,signup=1]
+                  [--rps 50] [--duration 60] [--warmup 5] [--concurrency 64] [--output results.json]
+
+The report is one JSON object: the run settings plus, per route, request and error counts,
+error rate, throughput, latency percentiles (ms) and status code counts.
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROUTES = ("signup", "login", "doctor_login", "profile", "patients", "patient", "history")
+DEFAULT_MIX = "profile=5,patients=2,patient=5,history=2,login=1,signup=1"
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise SystemExit(f"Unknown route in --mix: {name} (choose from {', '.join(ROUTES)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Client:
+    def __init__(self, base_url: str, manifest: dict, token_pool: int):
+        self.base_url = base_url.rstrip("/")
+        self.manifest = manifest
+        self.password = manifest["password"]
+        self._signup_counter = itertools.count()
+        self._run_id = int(time.time())
+        self.patient_tokens = self._login_sample("/login/", [p["email"] for p in manifest["patients"]], token_pool)
+        self.doctor_tokens = self._login_sample("/doctors/login/", manifest["doctors"], token_pool)
+
+    def request(self, method: str, path: str, body: dict = None, token: str = None):
+        headers = {"Accept": "application/json"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                payload = response.read()
+                return response.status, payload
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, None
+        except (urllib.error.URLError, OSError):
+            return 0, None
+
+    def _login_sample(self, path: str, emails, count: int):
+        # Log in a sample of users up front so authenticated routes don't each pay for bcrypt
+        tokens = []
+        for user_email in random.sample(emails, min(count, len(emails))):
+            status, payload = self.request("POST", path, {"email": user_email, "password": self.password})
+            if status == 200:
+                tokens.append(json.loads(payload)["access_token"])
+        return tokens
+
+    def call(self, route: str) -> int:
+        patients = self.manifest["patients"]
+        if route == "signup":
+            index = next(self._signup_counter)
+            status, _ = self.request("POST", "/signup/", {
+                "first_name": "Load", "last_name": f"Signup{index}",
+                "email": f"loadtest+{self.manifest['tag']}-signup{self._run_id}-{index}@example.com",
+                "age": 70, "gender": "other", "phone": "5550000000", "password": self.password,
+            })
+        elif route == "login":
+            status, _ = self.request("POST", "/login/", {"email": random.choice(patients)["email"], "password": self.password})
+        elif route == "doctor_login":
+            status, _ = self.request("POST", "/doctors/login/", {"email": random.choice(self.manifest["doctors"]), "password": self.password})
+        elif route == "profile":
+            status, _ = self.request("GET", "/profile/", token=random.choice(self.patient_tokens))
+        elif route == "patients":
+            status, _ = self.request("GET", "/patients/?limit=50")
+        elif route == "patient":
+            status, _ = self.request("GET", f"/patients/{random.choice(patients)['patient_id']}",
+                                     token=random.choice(self.doctor_tokens))
+        else:
+            status, _ = self.request("GET", f"/patients/{random.choice(patients)['patient_id']}/history",
+                                     token=random.choice(self.doctor_tokens))
+        return status
+
+
+def run(client: Client, weights: dict, rps: float, duration: float, warmup: float, concurrency: int):
+    names = list(weights)
+    cumulative = list(itertools.accumulate(weights[name] for name in names))
+    results = []
+    lock = threading.Lock()
+
+    def fire(route: str, due: float, measured: bool):
+        status = client.call(route)
+        latency = time.perf_counter() - due
+        if measured:
+            with lock:
+                results.append((route, status, latency))
+
+    total = int(rps * (warmup + duration))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            route = random.choices(names, cum_weights=cumulative)[0]
+            pool.submit(fire, route, due, i / rps >= warmup)
+    elapsed = time.perf_counter() - start - warmup
+    return results, elapsed
+
+
+def report(results, elapsed: float, args) -> dict:
+    by_route = defaultdict(list)
+    for route, status, latency in results:
+        by_route[route].append((status, latency))
+
+    routes = {}
+    for route, samples in sorted(by_route.items()):
+        latencies = sorted(latency * 1000 for _, latency in samples)
+        statuses = defaultdict(int)
+        for status, _ in samples:
+            statuses[str(status)] += 1
+        # signup/login 4xx are real failures here: every seeded credential is valid
+        errors = sum(1 for status, _ in samples if not 200 <= status < 300)
+        routes[route] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50), 2),
+                "p90": round(percentile(latencies, 0.90), 2),
+                "p95": round(percentile(latencies, 0.95), 2),
+                "p99": round(percentile(latencies, 0.99), 2),
+                "max": round(latencies[-1], 2),
+                "mean": round(sum(latencies) / len(latencies), 2),
+            },
+            "status_codes": dict(statuses),
+        }
+
+    total_errors = sum(route["errors"] for route in routes.values())
+    return {
+        "base_url": args.base_url,
+        "target_rps": args.rps,
+        "duration_s": args.duration,
+        "concurrency": args.concurrency,
+        "mix": parse_mix(args.mix),
+        "requests": len(results),
+        "achieved_rps": round(len(results) / elapsed, 2),
+        "error_rate": round(total_errors / len(results), 4) if results else 0.0,
+        "routes": routes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", default="loadtest_manifest.json")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight.")
+    parser.add_argument("--token-pool", type=int, default=20, help="Users logged in up front per role.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed, for a reproducible request sequence.")
+    parser.add_argument("--output", help="Write the report here instead of stdout.")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    weights = parse_mix(args.mix)
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    client = Client(args.base_url, manifest, args.token_pool)
+    if {"profile"} & set(weights) and not client.patient_tokens:
+        raise SystemExit("No patient could log in; check the manifest and --base-url")
+    if {"patient", "history"} & set(weights) and not client.doctor_tokens:
+        raise SystemExit("No doctor could log in; check the manifest and --base-url")
+
+    results, elapsed = run(client, weights, args.rps, args.duration, args.warmup, args.concurrency)
+    output = json.dumps(report(results, elapsed, args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Synthetic MoCA subtests and clock drawings shaped like what the mobile app submits, shared
+by seed.py and bench_processing.py. Responses are well-formed for every scorer in
+processing/speech_processing.py; the scores are what those scorers produce for them.
+"""
+import random
+
+NAMING = ["lion", "rhino", "camel"]
+MEMORY_WORDS = ["face", "velvet", "church", "daisy", "red"]
+SENTENCES = [
+    "I only know that John is the one to help today",
+    "The cat always hid under the couch when dogs were in the room",
+]
+FLUENCY_WORDS = ["fish", "fox", "farm", "fan", "fig", "fun", "fur", "fog", "fit", "fat", "feather",
+                 "fence", "flag", "frog", "fork"]
+ORIENTATION = ["march", "2025", "monday"]
+
+# Subtest name -> (expected_responses, actual_responses, score, aggregated_score)
+SUBTESTS = {
+    "naming": (NAMING, NAMING, [1, 1, 1], 3),
+    "memory": (MEMORY_WORDS, [MEMORY_WORDS, MEMORY_WORDS], [[1] * 5, [1] * 5], 0),
+    "attention_fs": (["2", "1", "8", "5", "4"], ["2", "1", "8", "5", "4"], [0] * 5, 0),
+    "attention_bs": (["7", "4", "2"], ["2", "4", "7"], [0] * 5, 0),
+    "attention_ss": (["93", "86", "79", "72", "65"], ["93", "86", "79", "72", "65"], [0] * 5, 0),
+    "sentence_repetition": ([[s] for s in SENTENCES], [[s] for s in SENTENCES], [1, 1], 2),
+    "verbal_fluency": (["f"], [[" ".join(FLUENCY_WORDS[:11])]], [11], 1),
+    "orientation": (ORIENTATION, ORIENTATION, [2, 2, 2], 6),
+}
+
+
+def _misspell(word: str, rng: random.Random) -> str:
+    if len(word) < 3:
+        return word
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice("aeiou") + word[position + 1:]
+
+
+def transcript_responses(rng: random.Random, error_rate: float = 0.2):
+    """
+    Unscored speech subtests as (subtest_name, expected, actual), with some transcribed words
+    misspelled so scoring does real fuzzy matching instead of only exact hits.
+    """
+    def heard(word):
+        return _misspell(word, rng) if rng.random() < error_rate else word
+
+    fluency = rng.sample(FLUENCY_WORDS, rng.randint(8, len(FLUENCY_WORDS)))
+    return [
+        ("naming", NAMING, [heard(w) for w in NAMING]),
+        ("memory", MEMORY_WORDS, [[heard(w) for w in MEMORY_WORDS] for _ in range(2)]),
+        ("attention_fs", ["2", "1", "8", "5", "4"], ["2", "1", "8", "5", "4"]),
+        ("attention_bs", ["7", "4", "2"], ["2", "4", "7"]),
+        ("attention_ss", ["93", "86", "79", "72", "65"], ["93", "86", "79", "72", "65"]),
+        ("sentence_repetition", [[s] for s in SENTENCES], [[" ".join(heard(w) for w in s.split())] for s in SENTENCES]),
+        ("verbal_fluency", ["f"], [[" ".join(fluency)]]),
+        ("orientation", ORIENTATION, [heard(w) for w in ORIENTATION]),
+    ]
+
+
+def render_clock(rng: random.Random, size: int = 512, hour: int = 11, minute: int = 10) -> bytes:
+    """
+    Draws a hand-drawn-looking clock (wobbly face, digits 1-12, hour and minute hands set to
+    hour:minute, the MoCA "ten past eleven") and returns it PNG-encoded.
+    """
+    import math
+
+    import cv2
+    import numpy as np
+
+    image = np.full((size, size, 3), 255, np.uint8)
+    center = np.array([size / 2 + rng.uniform(-10, 10), size / 2 + rng.uniform(-10, 10)])
+    radius = size * rng.uniform(0.36, 0.42)
+    thickness = rng.randint(2, 4)
+
+    # Face: a closed polyline whose radius wanders a little, like a freehand circle
+    angles = np.linspace(0, 2 * math.pi, 180, endpoint=False)
+    wobble = 1 + 0.02 * np.sin(angles * rng.randint(2, 5) + rng.uniform(0, math.pi))
+    face = np.stack([center[0] + radius * wobble * np.cos(angles),
+                     center[1] + radius * wobble * np.sin(angles)], axis=1).astype(np.int32)
+    cv2.polylines(image, [face], True, (0, 0, 0), thickness, cv2.LINE_AA)
+
+    # Digits, clockwise from 12 at the top
+    for number in range(1, 13):
+        angle = math.radians(number * 30 + rng.uniform(-4, 4))
+        distance = radius * rng.uniform(0.78, 0.84)
+        text = str(number)
+        (width, height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.1, thickness)
+        x = center[0] + distance * math.sin(angle) - width / 2
+        y = center[1] - distance * math.cos(angle) + height / 2
+        cv2.putText(image, text, (int(x), int(y)), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (0, 0, 0), thickness, cv2.LINE_AA)
+
+    # Hands: the hour hand is the shorter one
+    for fraction, length in (((hour % 12 + minute / 60) / 12, 0.45), (minute / 60, 0.7)):
+        angle = 2 * math.pi * fraction
+        tip = (int(center[0] + radius * length * math.sin(angle)), int(center[1] - radius * length * math.cos(angle)))
+        cv2.line(image, (int(center[0]), int(center[1])), tip, (0, 0, 0), thickness + 1, cv2.LINE_AA)
+
+    ok, encoded = cv2.imencode(".png", image)
+    return encoded.tobytes()
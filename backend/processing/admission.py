@@ -0,0 +1,102 @@
+import asyncio
+import math
+import os
+from contextlib import asynccontextmanager
+
+# Each admitted test runs the speech and CDT scoring scripts (spaCy, TensorFlow), so only a
+# few run at once; a bounded number more may wait, and anything beyond that is turned away
+PROCESSING_MAX_IN_FLIGHT = int(os.getenv("PROCESSING_MAX_IN_FLIGHT", "2"))
+PROCESSING_MAX_QUEUE = int(os.getenv("PROCESSING_MAX_QUEUE", "8"))
+
+
+class Saturated(Exception):
+    """Raised when every slot is busy and the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Processing queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounded in-flight jobs plus a bounded FIFO wait queue, with counters for /admission/stats."""
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        # Created on first use so it binds to the server's event loop, not the import-time one
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        # Moving average of job duration, used to suggest Retry-After
+        self.average_job_seconds = None
+
+    def retry_after(self) -> int:
+        """Seconds until a queue position is likely to free up."""
+        if self.average_job_seconds is None:
+            return 5
+        return max(1, math.ceil(self.average_job_seconds * (self.waiting + 1) / self.max_in_flight))
+
+    def record_duration(self, seconds: float):
+        if self.average_job_seconds is None:
+            self.average_job_seconds = seconds
+        else:
+            self.average_job_seconds = 0.8 * self.average_job_seconds + 0.2 * seconds
+
+    def reserve(self):
+        """
+        Take a place in the wait queue now, or raise Saturated if every slot is busy and the
+        queue is full. The place is held until slot(reserved=True) takes it or release() gives
+        it back, so requests answered before their job starts still count against the queue.
+        """
+        # Reserved jobs wait until they hold the semaphore, so in_flight + waiting covers both
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_queue:
+            raise Saturated(self.retry_after())
+        self.waiting += 1
+
+    def release(self):
+        """Give back a place taken by reserve() that no job will use."""
+        self.waiting -= 1
+
+    @asynccontextmanager
+    async def slot(self, reserved: bool = False):
+        """
+        Wait for a processing slot, taking a queue place first unless reserve() already did
+        (raising Saturated straight away if the queue is full).
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if not reserved:
+            self.reserve()
+
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "average_job_seconds": round(self.average_job_seconds, 2) if self.average_job_seconds else None,
+        }
+
+
+admission = AdmissionController(PROCESSING_MAX_IN_FLIGHT, PROCESSING_MAX_QUEUE)
@@ -3,19 +3,14 @@ import numpy as np
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
+from functools import lru_cache
 from keras.models import load_model
-from skimage import filters
 from scipy.stats import norm
-from sklearn.mixture import GaussianMixture
 from sklearn.cluster import KMeans
-from utils.featureRules import (
-    smooth_contour,
-    determine_overlap,
-    get_maximum_bounding,
-    area_of_intersection,
-)
-from utils.digitsAngles import get_angle_priors
 import sys
+import time
+import argparse
+import itertools
 
 # Get the project root directory (2 levels up from current script)
 project_root = os.path.dirname(
@@ -23,7 +18,20 @@ project_root = os.path.dirname(
 )
 sys.path.append(project_root)
 
-from processing.utils import DatabaseUtil
+# Import through the processing package so this module also loads when imported
+# from other scripts, where "utils" resolves to processing/utils.py
+from processing.cdt.utils.featureRules import (
+    smooth_contour,
+    determine_overlap,
+    get_maximum_bounding,
+    area_of_intersection,
+)
+from processing.cdt.utils.digitsAngles import get_angle_priors
+from processing.cdt.utils.handAngles import find_hands, angle_between
+from processing.cdt.utils.scratch import scratch
+from processing.cdt.utils.triage import triage_clock_image
+from processing.pipeline import Pipeline
+from processing.utils import DatabaseUtil, apply_thread_budget, record_timing, timed, test_id as default_test_id
 
 # from ..utils import DatabaseUtil
 
@@ -33,54 +41,120 @@ from processing.utils import DatabaseUtil
 script_dir = os.path.dirname(os.path.abspath(__file__))
 model_file = os.path.join(script_dir, "models/mnist_threshed_classifier.h5")
 
-features_df = pd.DataFrame()
-# ✅ Initialize a local dictionary to store features for the current image
-features_dict = {}
+# Bump whenever the feature extraction or scoring rules change, so rescore.py
+# picks up the clock drawings scored under the previous rules
+SCORER_VERSION = "2"
+
+
+@lru_cache(maxsize=1)
+def get_digit_model():
+    """
+    Loads the digit classifier once per process instead of once per image.
+    """
+    return load_model(model_file)
+
+
+def sobel_magnitude(thresh, out):
+    """
+    Sobel edge magnitude of a uint8 image into the float32 array out, normalized like
+    skimage.filters.sobel: intensities scaled to [0, 1], [1, 2, 1] / 4 smoothing, and the
+    root mean square of the two axis gradients.
+    """
+    gy = scratch("sobel_gy", thresh.shape, np.float32)
+    scale = 1 / (4 * 255)
+    cv2.Sobel(thresh, cv2.CV_32F, 1, 0, dst=out, ksize=3, scale=scale, borderType=cv2.BORDER_REFLECT)
+    cv2.Sobel(thresh, cv2.CV_32F, 0, 1, dst=gy, ksize=3, scale=scale, borderType=cv2.BORDER_REFLECT)
+    cv2.magnitude(out, gy, out)
+    out *= np.float32(1 / np.sqrt(2))
+    return out
+
+
+def hysteresis_threshold(edges, low, high, out):
+    """
+    Same result as skimage.filters.apply_hysteresis_threshold, written into the uint8 array out
+    as 0/1: pixels above low that are 4-connected to a pixel above high.
+    """
+    above_low = np.greater(edges, low, out=scratch("above_low", edges.shape, np.bool_))
+    above_high = np.greater(edges, high, out=scratch("above_high", edges.shape, np.bool_))
+    num_labels, labels = cv2.connectedComponents(
+        above_low.view(np.uint8), scratch("labels", edges.shape, np.int32), 4, cv2.CV_32S
+    )
+
+    # Lookup table from label to output value, set for every label that has a strong pixel
+    strong = np.zeros(num_labels, np.uint8)
+    strong[labels[above_high]] = 1
+    strong[0] = 0
+    return np.take(strong, labels, out=out)
+
+
+def select_clock_contour(contours):
+    """
+    Returns the contour with the largest minimum enclosing circle, the first one on ties, or None.
+    A contour's enclosing circle is no larger than half its bounding box diagonal, so contours
+    are visited largest box first and the search stops once no remaining box can beat the best
+    circle; most small contours never get a minEnclosingCircle call.
+    """
+    if len(contours) == 0:
+        return None
+
+    # Bounding box sizes of every contour at once, from the concatenated points
+    lengths = np.fromiter(map(len, contours), dtype=np.intp, count=len(contours))
+    points = np.concatenate(contours).reshape(-1, 2)
+    starts = np.concatenate(([0], np.cumsum(lengths[:-1])))
+    sizes = np.maximum.reduceat(points, starts) - np.minimum.reduceat(points, starts) + 1
+    upper_bounds = np.hypot(sizes[:, 0], sizes[:, 1]) / 2
+    # Stable, so equal bounds keep contour order
+    order = np.argsort(-upper_bounds, kind="stable")
+
+    best_index = None
+    best_radius = 0
+    for index in order:
+        if upper_bounds[index] < best_radius:
+            break
+        _, radius = cv2.minEnclosingCircle(contours[index])
+        if radius > best_radius or (radius == best_radius and best_index is not None and index < best_index):
+            best_index = index
+            best_radius = radius
+
+    return contours[best_index] if best_index is not None else None
 
 
-def compute_clock_features(image):
+def compute_clock_features(image, draw=True):
     """
     Extracts key features from the clock drawing image.
-    Returns a dictionary containing extracted features.
+    Returns the annotated drawing (None unless draw) and a single-row DataFrame containing
+    extracted features, or None for the features when no clock face contour is found.
     """
 
-    global features_df
+    # Initialize a local dictionary to store features for the current image
+    features_dict = {}
 
     # Feature 1: Extract Contours from the clock drawing image
 
-    vis = image.copy()
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-    thresh = cv2.threshold(blurred, 240, 255, cv2.THRESH_BINARY)[1]
-    edges = filters.sobel(thresh)
+    # Full-frame intermediates live in per-thread scratch buffers (see utils/scratch.py), so
+    # they are only allocated when the image size changes
+    shape = image.shape[:2]
+    vis = image.copy() if draw else None
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=scratch("gray", shape, np.uint8))
+    thresh = scratch("thresh", shape, np.uint8)
+    cv2.GaussianBlur(gray, (3, 3), 0, dst=thresh)
+    cv2.threshold(thresh, 240, 255, cv2.THRESH_BINARY, dst=thresh)
+    edges = sobel_magnitude(thresh, scratch("edges", shape, np.float32))
 
     # Parameters for hysteresis
     low = 0.01
     high = 0.20
 
-    hyst = filters.apply_hysteresis_threshold(edges, low, high).astype(int)
-    hight = (edges > high).astype(np.uint8)
-    inverted = hight + hyst
+    # Pixels above high are always part of the hysteresis result, so it alone is the contour mask
+    hyst = hysteresis_threshold(edges, low, high, scratch("hyst", shape, np.uint8))
 
     # Part 1: Contours #
 
-    contours = cv2.findContours(
-        inverted.copy().astype(np.uint8), cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE
-    )
-    biggest_moment = 0
-    clock_contour = None
-
-    # Loop through all contours, find the one with the biggest min circle area
-    for c in contours[0]:
-        # compute the center of the contour
-
-        circle_center, radius = cv2.minEnclosingCircle(c)
-        area = np.pi * (radius**2)
-        arc_length = cv2.arcLength(c, True)
-
-        if area > biggest_moment:
-            biggest_moment = area
-            clock_contour = c
+    contours = cv2.findContours(hyst, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE)
+    clock_contour = select_clock_contour(contours[0])
+    if clock_contour is None:
+        # Nothing to measure the face, digits or hands against
+        return vis, None
 
     epsilon = 0.009 * cv2.arcLength(clock_contour, True)
     hull = cv2.convexHull(clock_contour, returnPoints=True)
@@ -106,17 +180,14 @@ def compute_clock_features(image):
             cX = int(M["m10"] / M["m00"])
             cY = int(M["m01"] / M["m00"])
         except:
-            cX = int(inverted.shape[1] / 2)
-            cY = int(inverted.shape[0] / 2)
-
-        max_radius = 0
-        min_radius = 1000
-        for point in curve:
-            radius = np.linalg.norm(point - np.array([cX, cY]))
-            if radius > max_radius:
-                max_radius = radius
-            if radius < min_radius:
-                min_radius = radius
+            cX = int(thresh.shape[1] / 2)
+            cY = int(thresh.shape[0] / 2)
+
+        # Distance of every point from the centroid, in one pass over the curve
+        offsets = curve.reshape(-1, 2) - np.array([cX, cY])
+        radii = np.sqrt((offsets * offsets).sum(axis=1))
+        max_radius = max(0, radii.max())
+        min_radius = min(1000, radii.min())
 
         area = cv2.contourArea(curve)
         arc_length = cv2.arcLength(curve, True)
@@ -131,24 +202,25 @@ def compute_clock_features(image):
         cX = int(M["m10"] / M["m00"])
         cY = int(M["m01"] / M["m00"])
     except:
-        cX = int(inverted.shape[1] / 2)
-        cY = int(inverted.shape[0] / 2)
+        cX = int(thresh.shape[1] / 2)
+        cY = int(thresh.shape[0] / 2)
 
-    cv2.drawContours(vis, [best_curve], -1, (0, 0, 255), 2)
     circle_center, radius = cv2.minEnclosingCircle(best_curve)
 
-    cv2.circle(vis, (cX, cY), 5, (0, 0, 255), -1)
+    if draw:
+        cv2.drawContours(vis, [best_curve], -1, (0, 0, 255), 2)
+        cv2.circle(vis, (cX, cY), 5, (0, 0, 255), -1)
 
-    cv2.circle(
-        vis,
-        (int(circle_center[0]), int(circle_center[1])),
-        int(radius),
-        (0, 255, 255),
-        2,
-    )
-    cv2.circle(
-        vis, (int(circle_center[0]), int(circle_center[1])), 5, (0, 255, 255), -1
-    )
+        cv2.circle(
+            vis,
+            (int(circle_center[0]), int(circle_center[1])),
+            int(radius),
+            (0, 255, 255),
+            2,
+        )
+        cv2.circle(
+            vis, (int(circle_center[0]), int(circle_center[1])), 5, (0, 255, 255), -1
+        )
 
     center_deviation = np.linalg.norm(circle_center - np.array([cX, cY]))
 
@@ -170,13 +242,14 @@ def compute_clock_features(image):
     features_dict["CenterDeviation"] = center_deviation
 
     # Bleach out the contour for better hand detection and unused ink tallies
-    bleached = thresh.copy()
+    bleached = scratch("bleached", shape, np.uint8)
+    np.copyto(bleached, thresh)
     cv2.drawContours(bleached, [best_curve], -1, (255, 255, 255), 25)
 
     # ------------------------------------------------------------------------------------------------------------------ #
     # Feature 2: Extract digits from the clock drawing image
 
-    model = load_model(model_file)
+    model = get_digit_model()
     intersect_threshold = 0.5
     box_threshold = 80
     number_threshold = 0.5
@@ -238,7 +311,8 @@ def compute_clock_features(image):
 
     # Phase 3 - remove the outer contour and find boxes in what remains
 
-    inv = 255 - thresh
+    # Shares its buffer with the inverted bleached drawing below, which is made after MSER is done
+    inv = cv2.bitwise_not(thresh, dst=scratch("inverse", shape, np.uint8))
 
     # draw the contour and center of the shape on the image
     if clock_contour is not None:
@@ -356,13 +430,14 @@ def compute_clock_features(image):
             # Tabulate the digit
             recognized_digits[number] += 1
             passable_crops.append(crop)
-            cv2.rectangle(
-                vis,
-                (box[0], box[1]),
-                (box[0] + box[2], box[1] + box[3]),
-                (0, 150, 0),
-                2,
-            )
+            if draw:
+                cv2.rectangle(
+                    vis,
+                    (box[0], box[1]),
+                    (box[0] + box[2], box[1] + box[3]),
+                    (0, 150, 0),
+                    2,
+                )
             # Bleach the bounding box on the copy for ink use detection
             cv2.rectangle(
                 bleached,
@@ -371,15 +446,16 @@ def compute_clock_features(image):
                 (255),
                 -1,
             )
-            cv2.putText(
-                vis,
-                str(number),
-                (box[0] + 2, box[1] - 3),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 100, 0),
-                2,
-            )
+            if draw:
+                cv2.putText(
+                    vis,
+                    str(number),
+                    (box[0] + 2, box[1] - 3),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.5,
+                    (0, 100, 0),
+                    2,
+                )
 
     # Store computed features in the DataFrame
     if len(radii) > 0:
@@ -428,7 +504,7 @@ def compute_clock_features(image):
     # Feature 3: Extract Hand Features
     ####################################################################################################################
 
-    black = 255 - bleached
+    black = cv2.bitwise_not(bleached, dst=scratch("inverse", shape, np.uint8))
 
     # Size of box to search for connected components comprising "hands"
     search_ratio = 0.3
@@ -443,11 +519,12 @@ def compute_clock_features(image):
 
     # Get the connected components for the image
     num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(
-        black.astype(np.uint8)
+        black, labels=scratch("labels", shape, np.int32)
     )
 
-    # Set a mask which will contain all connected components with pixels within the search box
-    mask = np.zeros((vis.shape[0], vis.shape[1], 1), dtype="uint8")
+    # Lookup table from label to mask value, set to 255 for every component kept as a hand;
+    # the mask is then built in one pass over the labels
+    hand_labels = np.zeros(num_labels, np.uint8)
     num_components = 0
     bounding_box = None
 
@@ -468,22 +545,19 @@ def compute_clock_features(image):
 
         # Anything left which overlaps should be added to the mask
         if determine_overlap(component_rect, search_rect):
-            component_mask = (labels == j).astype("uint8") * 255
-            # cv2.imshow("vsi", inverted)
-            # cv2.waitKey(0)
-            mask = cv2.bitwise_or(mask, component_mask)
+            hand_labels[j] = 255
             num_components += 1
             if bounding_box == None:
                 bounding_box = [x, y, x + w, y + h]
             else:
                 bounding_box = get_maximum_bounding(bounding_box, [x, y, x + w, y + h])
 
-    blank_ch = 255 * np.ones_like(mask)
-    inv_mask = cv2.bitwise_not(mask)
+    # Set a mask which will contain all connected components with pixels within the search box
+    mask = np.take(hand_labels, labels, out=scratch("hand_mask", shape, np.uint8))
 
-    # Draw the hands onto the evaluation drawing in blue
-    colored_mask = cv2.merge([blank_ch, inv_mask, blank_ch])
-    vis = cv2.bitwise_and(vis, colored_mask)
+    # Draw the hands onto the evaluation drawing in magenta
+    if draw:
+        vis[mask > 0, 1] = 0
     # bleached = cv2.bitwise_and(bleached, blank_ch)
     if bounding_box:
         cv2.rectangle(
@@ -505,84 +579,48 @@ def compute_clock_features(image):
     k = 0.04
     threshold = 100
 
-    kernel = np.ones((5, 5))
-    fat_mask = mask
-    for j in range(3):
-        fat_mask = cv2.dilate(fat_mask, kernel)
-    dst = cv2.cornerHarris(mask, blockSize, apertureSize, k)
-    dst_norm = np.empty(dst.shape, dtype=np.float32)
-    cv2.normalize(dst, dst_norm, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX)
-    dst_norm_scaled = cv2.convertScaleAbs(dst_norm)
+    dst = cv2.cornerHarris(mask, blockSize, apertureSize, k, dst=scratch("harris", shape, np.float32))
+    dst_norm = cv2.normalize(dst, dst, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX)
 
     smallest_dist = 1000
     closest = (cX, cY)
-    # Find the closest corner to the center
-    for j in range(dst_norm.shape[0]):
-        for k in range(dst_norm.shape[1]):
-            if int(dst_norm[j, k]) > threshold:
-                distance = np.linalg.norm(np.array([k, j]) - np.array([cX, cY]))
-                if distance < smallest_dist:
-                    smallest_dist = distance
-                    closest = (k, j)
-
-    cv2.circle(vis, (closest), 5, (255, 0, 155), -1)
+    # Find the closest corner to the center; int() truncation means a response of at least
+    # threshold + 1, and argmin keeps the first in row-major order on ties
+    corner_ys, corner_xs = np.nonzero(dst_norm >= threshold + 1)
+    if len(corner_xs) > 0:
+        distances = np.sqrt((corner_xs - cX) ** 2.0 + (corner_ys - cY) ** 2.0)
+        nearest = np.argmin(distances)
+        if distances[nearest] < smallest_dist:
+            smallest_dist = distances[nearest]
+            closest = (int(corner_xs[nearest]), int(corner_ys[nearest]))
+
+    if draw:
+        cv2.circle(vis, (closest), 5, (255, 0, 155), -1)
     # cv2.imshow("Output", drawings[i])
     # cv2.waitKey(0)
 
-    if np.any(np.where(mask > 0)):
-        y_points, x_points = np.where(mask > 0)
+    y_points, x_points = np.nonzero(mask)
+    if y_points.any() or x_points.any():
         angles = (
             -1
             * (np.arctan2(y_points - closest[1], x_points - closest[0]) * 180 / np.pi)
             + 360
         ) % 360
-        angles = angles.reshape(-1, 1)
-        radii = np.linalg.norm(
-            np.array([x_points, y_points])
-            - np.array([closest[0], closest[1]]).reshape(-1, 1),
-            axis=0,
-        )
+        radii = np.hypot(x_points - closest[0], y_points - closest[1])
 
-        mixture = GaussianMixture(n_components=2, random_state=0).fit(angles)
-        mean1 = int(mixture.means_[0][0])
-        mean2 = int(mixture.means_[1][0])
-
-        # Get hands angle feature
-        hands_angle = np.abs(mean1 - mean2)
-
-        buffer = 7
-
-        hand1_pts = len(
-            np.where(((mean1 + buffer) > angles) & (angles > (mean1 - buffer)))[0]
+        # Two dominant directions of a circular angle histogram, with each hand's pixel count
+        # and length read from the same bins
+        (mean1, hand1_pts, hand1_length), (mean2, hand2_pts, hand2_length) = find_hands(
+            angles, radii, buffer=7
         )
-        hand1_idxs = np.argwhere(
-            ((mean1 + buffer) > angles) & (angles > (mean1 - buffer))
-        )
-        try:
-            hand1_radii = radii[hand1_idxs[:, 0]]
-            hand1_length = np.max(hand1_radii)
-        except:
-            pass
 
-        hand2_pts = len(
-            np.where(((mean2 + buffer) > angles) & (angles > (mean2 - buffer)))[0]
-        )
-        hand2_idxs = np.argwhere(
-            ((mean2 + buffer) > angles) & (angles > (mean2 - buffer))
-        )
-        try:
-            hand2_radii = radii[hand2_idxs[:, 0]]
-            hand2_length = np.max(hand2_radii)
-        except:
-            pass
+        # Get hands angle feature
+        hands_angle = angle_between(mean1, mean2)
 
         # Get hand length ratio feature
-        try:
-            short_hand = min(hand1_length, hand2_length)
-            long_hand = max(hand1_length, hand2_length)
-            length_ratio = short_hand / long_hand
-        except:
-            length_ratio = 0
+        short_hand = min(hand1_length, hand2_length)
+        long_hand = max(hand1_length, hand2_length)
+        length_ratio = short_hand / long_hand if long_hand > 0 else 0
 
         # Get hand density ratio feature
         little_hand = min(hand1_pts, hand2_pts)
@@ -613,24 +651,28 @@ def compute_clock_features(image):
     # ------------------------------------------------------------------------------------------------ #
     # Feature 4: Unaccounted Ink (measure of certainty in evaluation) #
 
-    original = 255 - thresh
-    original = original.astype(np.float32) / 255.0
-    original_total = np.sum(original)
+    # thresh and bleached are strictly 0/255, so ink is counted rather than summed as floats
+    original_total = thresh.size - cv2.countNonZero(thresh)
+    bleached_total = bleached.size - cv2.countNonZero(bleached)
 
-    bleached = 255 - bleached
-    bleached = bleached.astype(np.float32) / 255.0
-    bleached_total = np.sum(bleached)
-
-    ink_ratio = bleached_total / original_total
+    ink_ratio = bleached_total / original_total if original_total else float("nan")
     features_dict["LeftoverInk"] = ink_ratio
-    pen_pressure = np.mean(np.where(gray < 255))
+
+    # Mean of the row and column indices of every non-white pixel, from per-row and per-column
+    # counts instead of the index arrays
+    inked = np.less(gray, 255, out=scratch("inked", shape, np.bool_))
+    row_counts = np.count_nonzero(inked, axis=1)
+    column_counts = np.count_nonzero(inked, axis=0)
+    inked_total = int(row_counts.sum())
+    if inked_total:
+        index_sum = row_counts @ np.arange(shape[0]) + column_counts @ np.arange(shape[1])
+        pen_pressure = index_sum / (2 * inked_total)
+    else:
+        pen_pressure = float("nan")
     features_dict["PenPressure"] = pen_pressure
 
     # Convert the dictionary to a DataFrame (single row)
-    feature_row = pd.DataFrame([features_dict])
-
-    # ✅ Append extracted features to the global DataFrame
-    features_df = pd.concat([features_df, feature_row], ignore_index=True)
+    features_df = pd.DataFrame([features_dict])
 
     return vis, features_df
 
@@ -674,9 +716,10 @@ def evaluate_clock_drawing(features_df):
     return scores_df
 
 
-def process_single_image(image_path):
+def process_single_image(image_path, draw=False):
     """
     Processes a single clock image: extracts features, scores it, and saves the result.
+    The annotated drawing is only rendered when draw is set.
     """
     # Load image
     # image = cv2.imread(image_path)
@@ -688,7 +731,7 @@ def process_single_image(image_path):
     # print("Processing image:", image_path)
 
     # Extract features
-    opVis, opFeatures = compute_clock_features(image_path)
+    opVis, opFeatures = compute_clock_features(image_path, draw=draw)
 
     if opFeatures is None:
         print("Error: Could not detect valid clock face.")
@@ -698,7 +741,8 @@ def process_single_image(image_path):
     score_df = evaluate_clock_drawing(opFeatures)
 
     # Convert to RGB before displaying
-    vis_rgb = cv2.cvtColor(opVis, cv2.COLOR_BGR2RGB)
+    if opVis is not None:
+        vis_rgb = cv2.cvtColor(opVis, cv2.COLOR_BGR2RGB)
 
     # Display the processed image
     # plt.imshow(vis_rgb)
@@ -708,48 +752,161 @@ def process_single_image(image_path):
     return score_df, opFeatures
 
 
-# Construct the path to 50.jpg
-# image_path = os.path.join(script_dir, "data/sample_images/50.jpg")
+def unscorable_result(reason):
+    """
+    Result for a drawing that can't be scored: extracted_responses records why, and score and
+    aggregated_score stay NULL so the drawing isn't counted as a clock that earned no points.
+    The test still completes (see subtest_settled in migration 008) and reviewers see the reason.
+    """
+    return ["unscorable", reason], None, None
 
 
-if __name__ == "__main__":
-    db_util = DatabaseUtil()
+def decode_clock_image(image):
+    """
+    Decodes an encoded clock drawing (bytes or any buffer) into a BGR image, None if it can't be.
+    """
+    # Decode the buffer into an OpenCV image without copying it first
+    return cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
 
-    try:
-        db_util.SessionFactory()
-        print("Database connection is active.")
-    except Exception as e:
-        print(f"Failed to establish connection: {e}")
 
-    df = db_util.extract_data("cdt")
+def score_clock_image(image):
+    """
+    Decodes an encoded clock drawing (bytes or any buffer) and scores it.
+    Returns (extracted_responses, score, aggregated_score) ready for DatabaseUtil.load_data.
+    """
+    return score_decoded_clock_image(decode_clock_image(image))
 
 
-    image_id = int(df["actual_responses"].iloc[0][0])
+def score_decoded_clock_image(image_cv2):
+    """
+    Scores a decoded clock drawing; same result as score_clock_image.
+    """
+    # Blank, cropped and non-drawing images are turned away in milliseconds instead of going
+    # through the whole pipeline first
+    triage = triage_clock_image(image_cv2)
+    if not triage.scorable:
+        print(f"Unscorable clock drawing: {triage.reason} (ink {triage.ink_fraction:.3f})")
+        return unscorable_result(triage.reason)
 
-    # print(image_id)
+    result = process_single_image(image_cv2)
+    if result is None:
+        return unscorable_result("no_clock_contour")
+    df_result, df_extract = result
 
-    image = db_util.fetch_image(image_id)
+    # Scores come out of a DataFrame, so convert numpy ints to native Python types
+    score = [int(df_result[column].iloc[0]) for column in ["Contour", "Numbers", "Hand_Length", "Hand_Centering"]]
 
-    # df_result, df_extract = process_single_image(image)
+    extracted_responses = [str(num) for num in score]
 
-    # print(df_result)
+    return extracted_responses, score, sum(score)
 
-    # Convert blob (binary) data to a NumPy array
-    image_np = np.frombuffer(image, np.uint8)
 
-    # Decode it into an OpenCV image
-    image_cv2 = cv2.imdecode(image_np, cv2.IMREAD_COLOR)
+# Construct the path to 50.jpg
+# image_path = os.path.join(script_dir, "data/sample_images/50.jpg")
 
-    df_result, df_extract = process_single_image(image_cv2)
 
-    score = [df_result["Contour"].iloc[0], df_result["Numbers"].iloc[0], df_result["Hand_Length"].iloc[0], df_result["Hand_Centering"].iloc[0]]
+def fetch_clock_image(db_util, test_id):
+    """
+    Loads a test's cdt record and decodes its drawing. Runs on the pipeline's I/O threads.
+    """
+    with timed(test_id, "cdt", "fetch"):
+        record = db_util.fetch_record("cdt", test_id)
+        if record is None:
+            raise LookupError(f"No cdt record found for test {test_id}.")
+
+        image_id = int(record.actual_responses[0])
+        image = db_util.fetch_image(image_id)
+        if image is None:
+            raise LookupError(f"Image {image_id} not found.")
+        return record, decode_clock_image(image)
+
+
+def write_clock_scores(db_util, batch):
+    """
+    Writes a batch of (test_id, (record, scored)) results from the pipeline in one transaction.
+    """
+    start = time.time()
+    rows = [
+        (record.subtest_id, extracted_responses, score, aggregated_score, SCORER_VERSION)
+        for _, (record, (extracted_responses, score, aggregated_score)) in batch
+    ]
+    written = db_util.load_data_batch(rows)
+    end = time.time()
+    for test_id, (_, (_, score, _)) in batch:
+        record_timing(test_id, "cdt", "write", start, end)
+        print(f"{test_id}: {score}")
+    return written
 
-    extracted_responses = [str(num) for num in score]
 
-    aggregated_score = sum(score)
-    subtest_id = int(df["subtest_id"].iloc[0])
+# Drawings flagged unscorable keep a NULL score but aren't picked up again
+UNSCORED_CDT_QUERY = """
+    SELECT test_id FROM test_records
+    WHERE subtest_name = 'cdt' AND score IS NULL AND extracted_responses IS NULL
+    ORDER BY subtest_id
+"""
 
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
 
-    print(df_result)
-    
\ No newline at end of file
+def score_clock_tests(db_util, test_ids, fetch_threads, score_threads, prefetch, write_batch):
+    """
+    Scores the cdt subtest of every test in test_ids (any iterable, consumed lazily). Upcoming
+    drawings are fetched and decoded while the current ones are scored, and scores are
+    written back in batches. Returns the pipeline's counts.
+    """
+    # Loaded before the scoring threads start, so they don't race to load it
+    get_digit_model()
+
+    def score(test_id, loaded):
+        record, image_cv2 = loaded
+        with timed(test_id, "cdt", "score"):
+            return record, score_decoded_clock_image(image_cv2)
+
+    pipeline = Pipeline(
+        fetch=lambda test_id: fetch_clock_image(db_util, test_id),
+        score=score,
+        write_batch=lambda batch: write_clock_scores(db_util, batch),
+        fetch_threads=fetch_threads,
+        score_threads=score_threads,
+        prefetch=prefetch,
+        batch_size=write_batch,
+    )
+    return pipeline.run(test_ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score the clock drawing (cdt) subtest of tests.")
+    parser.add_argument("test_ids", nargs="*", help="Tests to score (default: the sample test).")
+    parser.add_argument("--unscored", action="store_true", help="Score every cdt record that has no score yet.")
+    parser.add_argument("--fetch-threads", type=int, default=int(os.getenv("CDT_FETCH_THREADS", "2")),
+                        help="Threads fetching and decoding drawings.")
+    parser.add_argument("--score-threads", type=int, default=int(os.getenv("CDT_SCORE_THREADS", "1")),
+                        help="Threads extracting features and scoring.")
+    parser.add_argument("--prefetch", type=int, default=int(os.getenv("CDT_PREFETCH", "8")),
+                        help="Drawings fetched ahead of scoring, per queue.")
+    parser.add_argument("--write-batch", type=int, default=int(os.getenv("CDT_WRITE_BATCH", "50")),
+                        help="Scores written back per transaction.")
+    args = parser.parse_args()
+
+    test_ids = args.test_ids or ([] if args.unscored else [default_test_id])
+    # Imports (Keras, OpenCV, sklearn) are done; the time since dispatch is start-up cost
+    for test_id in test_ids:
+        record_timing(test_id, None, "cdt_ready", time.time())
+    # Holds OpenCV, TensorFlow, OpenMP and BLAS to the per-worker budget server.py passed in
+    apply_thread_budget()
+    db_util = DatabaseUtil()
+
+    try:
+        db_util.SessionFactory()
+        print("Database connection is active.")
+    except Exception as e:
+        print(f"Failed to establish connection: {e}")
+
+    if args.unscored:
+        test_ids = itertools.chain(test_ids, (row[0] for row in db_util.stream_rows(UNSCORED_CDT_QUERY)))
+
+    counts = score_clock_tests(
+        db_util, test_ids, args.fetch_threads, args.score_threads, args.prefetch, args.write_batch
+    )
+    print(f"cdt: {counts}")
+    db_util.close_connection()
+    # server.py treats a non-zero exit as a failed run
+    sys.exit(1 if counts["failed"] else 0)
@@ -0,0 +1,57 @@
+import numpy as np
+
+""" Locates the two clock hands from the pixels of the hands mask, using a circular histogram of
+    their angles around the point where the hands meet
+"""
+
+BINS = 360
+
+
+def angle_histogram(angles, radii):
+    """
+    Bins angles (degrees, [0, 360)) into 1 degree bins.
+    Returns the pixel count and the largest radius in every bin.
+    """
+    bins = angles.astype(np.intp) % BINS
+    counts = np.bincount(bins, minlength=BINS)
+    max_radii = np.zeros(BINS)
+    np.maximum.at(max_radii, bins, radii)
+    return counts, max_radii
+
+
+def window(center, buffer):
+    """Bins within buffer degrees of center, wrapping around 0/360."""
+    return np.arange(center - buffer, center + buffer) % BINS
+
+
+def find_hands(angles, radii, buffer=7):
+    """
+    Finds the two dominant directions of the hand pixels.
+    A hand's direction is the bin whose window of +/- buffer degrees holds the most pixels; the
+    second hand is the best window that doesn't overlap the first. Ties go to the smaller angle.
+    Returns [(angle, pixel_count, length), ...] for both hands, where pixel_count and length are
+    the number of pixels and the largest radius within the hand's window.
+    """
+    counts, max_radii = angle_histogram(angles, radii)
+
+    # Pixel count of the window around every bin, circularly
+    windowed = np.zeros(BINS, dtype=counts.dtype)
+    for offset in range(-buffer, buffer):
+        windowed += np.roll(counts, -offset)
+
+    hands = []
+    for _ in range(2):
+        angle = int(np.argmax(windowed))
+        bins = window(angle, buffer)
+        hands.append((angle, int(counts[bins].sum()), float(max_radii[bins].max())))
+
+        # Directions whose window would share pixels with this hand's can't be the other hand
+        windowed[np.arange(angle - 2 * buffer + 1, angle + 2 * buffer) % BINS] = -1
+
+    return hands
+
+
+def angle_between(angle1, angle2):
+    """Smallest angle in degrees between two directions."""
+    difference = abs(angle1 - angle2) % BINS
+    return min(difference, BINS - difference)
@@ -0,0 +1,24 @@
+import threading
+
+import numpy as np
+
+""" Full-frame scratch arrays for the clock feature pipeline. They are kept per thread and reused
+    across images of the same size, so scoring a drawing doesn't allocate a fresh set of buffers
+"""
+
+_local = threading.local()
+
+
+def scratch(name, shape, dtype):
+    """
+    Returns the calling thread's buffer called name, reallocated only when shape or dtype changes.
+    The contents are whatever the previous image left there.
+    """
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+
+    buffer = buffers.get(name)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = buffers[name] = np.empty(shape, dtype)
+    return buffer
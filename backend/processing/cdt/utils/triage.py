@@ -0,0 +1,82 @@
+from typing import NamedTuple, Optional
+
+import cv2
+
+""" Cheap checks on a downsampled copy of a clock image that turn away blank, tiny or
+    non-drawing images before the full feature pipeline (MSER, digit classifier) runs on them.
+    Only images that can't be a drawing at all are rejected: an open or distorted clock face is
+    exactly what the test scores, so the drawing's shape is left to the pipeline.
+"""
+
+# Longest side of the copy the checks run on
+TRIAGE_SIDE = 256
+
+MIN_SIDE = 64
+MAX_ASPECT_RATIO = 4.0
+
+# Same cut-off compute_clock_features thresholds ink at
+INK_THRESHOLD = 240
+# Blank or nearly blank paper below, photos and screens (no white background) above
+MIN_INK_FRACTION = 0.002
+MAX_INK_FRACTION = 0.35
+
+# Radius of the largest ink contour's enclosing circle, relative to half the shorter side
+MIN_CLOCK_RADIUS_RATIO = 0.25
+
+
+class TriageResult(NamedTuple):
+    """
+    Outcome of triage_clock_image. reason is None for scorable images, otherwise one of
+    "undecodable", "too_small", "bad_aspect_ratio", "blank", "not_a_drawing", "drawing_too_small".
+    """
+
+    scorable: bool
+    reason: Optional[str]
+    ink_fraction: float
+    clock_radius_ratio: float
+
+
+def downsample_gray(image, side=TRIAGE_SIDE):
+    h, w = image.shape[:2]
+    scale = side / max(h, w)
+    if scale < 1:
+        # INTER_AREA keeps thin pen strokes as grey pixels instead of skipping over them
+        image = cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def largest_contour_radius(ink):
+    """Enclosing circle radius of the largest outer ink contour, closed or not, or 0."""
+    contours, _ = cv2.findContours(ink, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return max((cv2.minEnclosingCircle(contour)[1] for contour in contours), default=0.0)
+
+
+def triage_clock_image(image):
+    """
+    Checks a decoded BGR (or grayscale) clock drawing for image sanity, ink coverage and a
+    drawing of a plausible size. Runs in a few milliseconds whatever the input size.
+    """
+    if image is None or image.size == 0:
+        return TriageResult(False, "undecodable", 0.0, 0.0)
+
+    h, w = image.shape[:2]
+    if min(h, w) < MIN_SIDE:
+        return TriageResult(False, "too_small", 0.0, 0.0)
+    if max(h, w) / min(h, w) > MAX_ASPECT_RATIO:
+        return TriageResult(False, "bad_aspect_ratio", 0.0, 0.0)
+
+    gray = downsample_gray(image)
+    ink = cv2.threshold(gray, INK_THRESHOLD, 255, cv2.THRESH_BINARY_INV)[1]
+    ink_fraction = cv2.countNonZero(ink) / ink.size
+    if ink_fraction < MIN_INK_FRACTION:
+        return TriageResult(False, "blank", ink_fraction, 0.0)
+    if ink_fraction > MAX_INK_FRACTION:
+        return TriageResult(False, "not_a_drawing", ink_fraction, 0.0)
+
+    clock_radius_ratio = largest_contour_radius(ink) / (min(gray.shape) / 2)
+    if clock_radius_ratio < MIN_CLOCK_RADIUS_RATIO:
+        return TriageResult(False, "drawing_too_small", ink_fraction, clock_radius_ratio)
+
+    return TriageResult(True, None, ink_fraction, clock_radius_ratio)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from utils import DB_URL
+
+# Score subtests as their rows are inserted (see database/migrations/007_test_records_notify.sql)
+# instead of only when the whole test is submitted
+PROCESSING_LISTEN = os.getenv("PROCESSING_LISTEN", "1") == "1"
+# Rows inserted together arrive together; a short wait lets them share one scoring run
+PROCESSING_NOTIFY_DEBOUNCE_SECONDS = float(os.getenv("PROCESSING_NOTIFY_DEBOUNCE_SECONDS", "0.5"))
+NOTIFY_CHANNEL = "test_record_inserted"
+RECONNECT_SECONDS = 5
+
+
+class IncrementalScorer:
+    """
+    Starts scoring the subtests of a test as their insert notifications come in, grouped per test
+    for debounce_seconds. The explicit per-test run calls settle() first and only scores what the
+    incremental runs didn't; notifications arriving while owned(test_id) holds are dropped, so
+    they don't start a run racing the explicit one.
+    """
+
+    def __init__(self, score_subtests, debounce_seconds: float, owned=lambda test_id: False,
+                 max_tests: int = 10000):
+        # Coroutine function (test_id, subtests) -> set of the subtests it scored
+        self.score_subtests = score_subtests
+        self.debounce_seconds = debounce_seconds
+        # Whether the explicit run has the test (running, or finished moments ago)
+        self.owned = owned
+        self.max_tests = max_tests
+        self._pending = {}
+        self._timers = {}
+        self._running = {}
+        # test_id -> subtests scored ahead of the explicit run, oldest first
+        self._scored = OrderedDict()
+        self.notifications = 0
+        self.dropped = 0
+        self.runs = 0
+        self.subtests_scored = 0
+
+    def notify(self, test_id: str, subtest_name: str):
+        self.notifications += 1
+        if self.owned(test_id):
+            self.dropped += 1
+            return
+        self._pending.setdefault(test_id, set()).add(subtest_name)
+        if test_id not in self._timers:
+            loop = asyncio.get_event_loop()
+            self._timers[test_id] = loop.call_later(self.debounce_seconds, self._start, test_id)
+
+    def _start(self, test_id: str):
+        self._timers.pop(test_id, None)
+        subtests = self._pending.pop(test_id, None)
+        if not subtests or self.owned(test_id):
+            return
+        task = asyncio.ensure_future(self._run(test_id, subtests))
+        running = self._running.setdefault(test_id, set())
+        running.add(task)
+
+        def finished(_):
+            running.discard(task)
+            if not running and self._running.get(test_id) is running:
+                del self._running[test_id]
+
+        task.add_done_callback(finished)
+
+    async def _run(self, test_id: str, subtests: set):
+        try:
+            scored = await self.score_subtests(test_id, subtests)
+        except Exception as e:
+            print(f"Incremental scoring of {test_id} {sorted(subtests)} failed: {e}")
+            return
+        self.runs += 1
+        self.subtests_scored += len(scored)
+        self._scored[test_id] = self._scored.pop(test_id, set()) | scored
+        while len(self._scored) > self.max_tests:
+            self._scored.popitem(last=False)
+
+    async def settle(self, test_id: str) -> set:
+        """
+        Takes over the test's subtests still waiting out the debounce, waits for its incremental
+        runs in progress, and returns (and forgets) the subtests they scored.
+        """
+        timer = self._timers.pop(test_id, None)
+        if timer is not None:
+            timer.cancel()
+        self._pending.pop(test_id, None)
+
+        running = self._running.get(test_id)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        return self._scored.pop(test_id, set())
+
+    def stats(self) -> dict:
+        return {
+            "notifications": self.notifications,
+            "dropped": self.dropped,
+            "debouncing": len(self._pending),
+            "running": sum(len(tasks) for tasks in self._running.values()),
+            "runs": self.runs,
+            "subtests_scored": self.subtests_scored,
+        }
+
+
+def connect(channel: str):
+    """Opens an autocommit connection listening on channel (blocking, so run in an executor)."""
+    connection = psycopg2.connect(DB_URL)
+    try:
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {channel}")
+    except Exception:
+        connection.close()
+        raise
+    return connection
+
+
+async def listen(on_notify, channel: str = NOTIFY_CHANNEL):
+    """
+    Calls on_notify(test_id, subtest_name) per inserted row, over one LISTEN connection kept for
+    the life of the service. Connecting happens in the default executor and the socket is
+    watched by the event loop, so an unreachable database never blocks requests. After a lost
+    connection it tries again every RECONNECT_SECONDS; rows inserted meanwhile are still scored
+    by the explicit per-test run.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        connection = None
+        try:
+            connection = await loop.run_in_executor(None, connect, channel)
+            print(f"Listening for {channel} notifications.")
+
+            readable = asyncio.Event()
+            loop.add_reader(connection.fileno(), readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        try:
+                            payload = json.loads(notification.payload)
+                            if payload["test_id"]:
+                                on_notify(payload["test_id"], payload["subtest_name"])
+                        except (ValueError, KeyError) as e:
+                            print(f"Ignoring malformed notification {notification.payload!r}: {e}")
+            finally:
+                loop.remove_reader(connection.fileno())
+        except (psycopg2.Error, OSError) as e:
+            print(f"Notification listener lost its connection: {e}")
+        finally:
+            if connection is not None:
+                connection.close()
+        await asyncio.sleep(RECONNECT_SECONDS)
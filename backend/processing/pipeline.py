@@ -0,0 +1,138 @@
+"""
+Streaming fetch -> score -> write pipeline for the scoring scripts.
+
+Fetch threads load (and decode) upcoming items while scoring threads work on the current ones,
+and one writer thread sends results back in batches. Queues between the stages are bounded,
+so a slow stage holds the others back instead of the whole input piling up in memory.
+"""
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    fetch(item) -> loaded, score(item, loaded) -> result and write_batch([(item, result), ...]) -> bool.
+    An item whose fetch or score raises is reported and skipped; the rest carry on.
+    """
+
+    def __init__(self, fetch, score, write_batch, fetch_threads=2, score_threads=1, prefetch=8,
+                 batch_size=50, flush_seconds=1.0):
+        self.fetch = fetch
+        self.score = score
+        self.write_batch = write_batch
+        self.fetch_threads = max(1, fetch_threads)
+        self.score_threads = max(1, score_threads)
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._pending = queue.Queue(maxsize=max(1, prefetch))
+        self._loaded = queue.Queue(maxsize=max(1, prefetch))
+        self._scored = queue.Queue(maxsize=max(1, batch_size) * 2)
+        self._lock = threading.Lock()
+        self.counts = {"fetched": 0, "scored": 0, "written": 0, "failed": 0}
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def _feed(self, items):
+        try:
+            for item in items:
+                self._pending.put(item)
+        except Exception as e:
+            print(f"Stopped reading items: {e}")
+            self._count("failed")
+        finally:
+            for _ in range(self.fetch_threads):
+                self._pending.put(_DONE)
+
+    def _fetch_worker(self):
+        while True:
+            item = self._pending.get()
+            if item is _DONE:
+                return
+            try:
+                loaded = self.fetch(item)
+            except Exception as e:
+                print(f"Skipping {item}: fetch failed: {e}")
+                self._count("failed")
+                continue
+            self._count("fetched")
+            self._loaded.put((item, loaded))
+
+    def _score_worker(self):
+        while True:
+            entry = self._loaded.get()
+            if entry is _DONE:
+                return
+            item, loaded = entry
+            entry = None
+            try:
+                result = self.score(item, loaded)
+            except Exception as e:
+                print(f"Skipping {item}: scoring failed: {e}")
+                self._count("failed")
+                continue
+            finally:
+                loaded = None  # Don't hold the decoded image while waiting for the next one
+            self._count("scored")
+            self._scored.put((item, result))
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            written = self.write_batch(batch)
+        except Exception as e:
+            print(f"Writing {len(batch)} results failed: {e}")
+            written = False
+        if written:
+            self._count("written", len(batch))
+        else:
+            self._count("failed", len(batch))
+        batch.clear()
+
+    def _writer(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                entry = self._scored.get(timeout=timeout)
+            except queue.Empty:
+                # Results trickling in slowly are still written within flush_seconds
+                self._flush(batch)
+                deadline = None
+                continue
+            if entry is _DONE:
+                self._flush(batch)
+                return
+            batch.append(entry)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_seconds
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                deadline = None
+
+    def run(self, items):
+        """Runs every item through the stages; returns the fetched/scored/written/failed counts."""
+        feeder = threading.Thread(target=self._feed, args=(items,), daemon=True)
+        fetchers = [threading.Thread(target=self._fetch_worker, daemon=True) for _ in range(self.fetch_threads)]
+        scorers = [threading.Thread(target=self._score_worker, daemon=True) for _ in range(self.score_threads)]
+        writer = threading.Thread(target=self._writer, daemon=True)
+        for thread in [feeder, *fetchers, *scorers, writer]:
+            thread.start()
+
+        # Each stage is told it's done once the stage feeding it has finished
+        feeder.join()
+        for thread in fetchers:
+            thread.join()
+        for _ in scorers:
+            self._loaded.put(_DONE)
+        for thread in scorers:
+            thread.join()
+        self._scored.put(_DONE)
+        writer.join()
+        return dict(self.counts)
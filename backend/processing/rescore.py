@@ -0,0 +1,221 @@
+"""
+Backfill that rescores stored test_records whose scorer_version is out of date.
+
+Stale rows are streamed through a server-side cursor one subtest at a time, scored in a
+pool of worker processes and written back in bulk batches. After every committed batch the
+last subtest_id is saved to a checkpoint file, so an interrupted run resumes where it stopped.
+The checkpoint never moves past a row whose scoring failed, so the next run retries it; rows
+rescored since are skipped by their scorer_version, so going back over them costs little.
+
+Usage (from the backend directory):
+    python3 processing/rescore.py [--subtest naming --subtest cdt] [--workers 4] [--threads-per-worker 2]
+                                  [--batch-size 200] [--checkpoint rescore_checkpoint.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import DatabaseUtil, TestRecord, apply_thread_budget, thread_budget
+from speech_processing import SCORER_VERSIONS, SPEECH_SCORERS, score_record
+from verbal_fluency import load_verbal_fluency_nlp
+
+CDT_SUBTEST = "cdt"
+
+# Only rows that were scored before (score IS NOT NULL) are rescored; unscored rows are
+# still handled by the regular per-test pipeline.
+STALE_QUERY = """
+    SELECT test_id, subtest_id, subtest_name, expected_responses, actual_responses
+    FROM test_records
+    WHERE subtest_name = :subtest_name
+      AND score IS NOT NULL
+      AND scorer_version IS DISTINCT FROM :scorer_version
+      AND subtest_id > :after
+    ORDER BY subtest_id
+"""
+
+# Per-process state for the pool workers, filled in lazily
+_worker_state = {}
+
+
+def cdt_scorer_version():
+    """
+    Imports the CDT module only when clock drawings are actually rescored,
+    since it pulls in Keras and the OpenCV pipeline.
+    """
+    from processing.cdt.cdt import SCORER_VERSION
+
+    return SCORER_VERSION
+
+
+def _init_worker(threads=None):
+    """
+    Makes the backend directory importable in spawned workers (needed for processing.cdt)
+    and holds each worker to its share of the cores.
+    """
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    if threads is not None:
+        apply_thread_budget(threads)
+
+
+def _score_one(record):
+    """
+    Scores a single record inside a worker process.
+    """
+    if record.subtest_name == CDT_SUBTEST:
+        from processing.cdt.cdt import score_clock_image
+
+        if "db_util" not in _worker_state:
+            _worker_state["db_util"] = DatabaseUtil()
+        image = _worker_state["db_util"].fetch_image(int(record.actual_responses[0]))
+        if image is None:
+            raise ValueError(f"image {record.actual_responses[0]} not found")
+        return score_clock_image(image)
+
+    if record.subtest_name == "verbal_fluency" and "nlp" not in _worker_state:
+        _worker_state["nlp"] = load_verbal_fluency_nlp()
+    return score_record(record, _worker_state.get("nlp"))
+
+
+def rescore_batch(records, scorer_version):
+    """
+    Scores a batch of records in a worker process.
+    Returns the rows to write back, the last subtest_id covered by the batch and the first
+    subtest_id whose scoring failed (None if all were scored).
+    """
+    rows = []
+    first_failed = None
+    for record in records:
+        try:
+            extracted_responses, score, aggregated_score = _score_one(record)
+        except Exception as e:
+            print(f"Skipping subtest {record.subtest_id} ({record.subtest_name}): {e}")
+            if first_failed is None:
+                first_failed = record.subtest_id
+            continue
+        rows.append((record.subtest_id, extracted_responses, score, aggregated_score, scorer_version))
+    return rows, records[-1].subtest_id, first_failed
+
+
+def load_checkpoint(path):
+    """
+    Reads the last committed subtest_id per subtest, keyed by subtest name and scorer version.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    """
+    Writes the checkpoint atomically so a crash never leaves a half-written file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def iter_batches(records, batch_size):
+    """
+    Groups a record stream into lists of at most batch_size records.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def rescore_subtest(db_util, executor, subtest_name, scorer_version, args, checkpoint):
+    """
+    Streams and rescores the stale rows of one subtest. Returns the number of rows written.
+    """
+    key = f"{subtest_name}@{scorer_version}"
+    after = checkpoint.get(key, 0)
+    params = {"subtest_name": subtest_name, "scorer_version": scorer_version, "after": after}
+
+    # Rows stream straight from the server-side cursor; at most workers * 2 batches are in flight
+    records = (TestRecord(*row) for row in db_util.stream_rows(STALE_QUERY, params, args.batch_size))
+    pending = deque()
+    written = 0
+    failed_at = None
+
+    def drain_one():
+        nonlocal written, failed_at
+        rows, last_subtest_id, first_failed = pending.popleft().result()
+        if not db_util.load_data_batch(rows):
+            raise RuntimeError(f"Failed to write batch ending at subtest {last_subtest_id}")
+        written += len(rows)
+        if failed_at is None and first_failed is not None:
+            failed_at = first_failed
+            # Stop just before it, so the next run starts with the row that failed
+            checkpoint[key] = first_failed - 1
+            save_checkpoint(args.checkpoint, checkpoint)
+        elif failed_at is None:
+            checkpoint[key] = last_subtest_id
+            save_checkpoint(args.checkpoint, checkpoint)
+
+    for batch in iter_batches(records, args.batch_size):
+        pending.append(executor.submit(rescore_batch, batch, scorer_version))
+        if len(pending) >= args.workers * 2:
+            drain_one()
+
+    # Batches finish in submission order, so the checkpoint only ever moves forward
+    while pending:
+        drain_one()
+
+    print(f"{subtest_name}: rescored {written} rows to version {scorer_version}")
+    if failed_at is not None:
+        print(f"{subtest_name}: some rows failed to score, from subtest {failed_at}; run again to retry them")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore test_records produced by older scorer versions.")
+    parser.add_argument("--subtest", action="append", help="Subtest to rescore (repeatable, default: all).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring worker processes.")
+    parser.add_argument("--threads-per-worker", type=int,
+                        help="Thread budget per worker (default: PROCESSING_THREADS_PER_WORKER or cores / workers).")
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per scoring and write-back batch.")
+    parser.add_argument("--checkpoint", default="rescore_checkpoint.json", help="Checkpoint file for resuming.")
+    parser.add_argument("--reset", action="store_true", help="Ignore any existing checkpoint.")
+    args = parser.parse_args()
+
+    subtests = args.subtest or list(SPEECH_SCORERS) + [CDT_SUBTEST]
+    versions = dict(SCORER_VERSIONS)
+    if CDT_SUBTEST in subtests:
+        _init_worker()
+        versions[CDT_SUBTEST] = cdt_scorer_version()
+
+    unknown = [name for name in subtests if name not in versions]
+    if unknown:
+        parser.error(f"unknown subtest(s): {', '.join(unknown)}")
+
+    threads = args.threads_per_worker or thread_budget(args.workers)
+    print(f"Scoring with {args.workers} workers x {threads} threads")
+
+    checkpoint = {} if args.reset else load_checkpoint(args.checkpoint)
+    db_util = DatabaseUtil()
+    total = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(threads,)) as executor:
+            for subtest_name in subtests:
+                total += rescore_subtest(db_util, executor, subtest_name, versions[subtest_name], args, checkpoint)
+    finally:
+        db_util.close_connection()
+
+    print(f"Rescored {total} rows in total.")
+
+
+if __name__ == "__main__":
+    main()
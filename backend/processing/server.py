@@ -1,7 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any
-import subprocess
+import asyncio
+import os
+import sys
+import time
+
+from admission import PROCESSING_MAX_IN_FLIGHT, Saturated, admission
+from listener import PROCESSING_LISTEN, PROCESSING_NOTIFY_DEBOUNCE_SECONDS, IncrementalScorer, listen
+from singleflight import single_flight
+from utils import count_threads, record_timing, thread_budget, thread_budget_env, timed
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SPEECH_SCRIPT = os.path.join(SCRIPT_DIR, "speech_processing.py")
+CDT_SCRIPT = os.path.join(SCRIPT_DIR, "cdt", "cdt.py")
+CDT_SUBTEST = "cdt"
+
+# Up to PROCESSING_MAX_IN_FLIGHT scoring scripts run at once, so each gets that share of the cores
+WORKER_THREADS = thread_budget(PROCESSING_MAX_IN_FLIGHT)
+WORKER_ENV = thread_budget_env(WORKER_THREADS)
+THREAD_SAMPLE_INTERVAL_SECONDS = 0.5
+# Most threads seen in a running script, per script stage, for /admission/stats
+peak_worker_threads = {}
 
 app = FastAPI(
     title="Parkinson's Processing Service",
@@ -17,14 +37,28 @@ class TestIDRequest(BaseModel):
     test_id: str
 
 
+@app.on_event("startup")
+async def start_listener():
+    # Subtests are scored as their rows land; the explicit submission then only finishes up
+    if PROCESSING_LISTEN:
+        app.state.listener_task = asyncio.ensure_future(listen(incremental.notify))
+
+
+@app.on_event("shutdown")
+async def stop_listener():
+    task = getattr(app.state, "listener_task", None)
+    if task is not None:
+        task.cancel()
+
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """Health check endpoint"""
     return {"status": "healthy"}
 
 
-@app.post("/receive-test-id/")
-async def receive_test_id(request: TestIDRequest) -> Dict[str, Any]:
+@app.post("/receive-test-id/", status_code=202)
+async def receive_test_id(request: TestIDRequest, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     """
     Endpoint to receive test_id from the mobile app.
 
@@ -32,24 +66,188 @@ async def receive_test_id(request: TestIDRequest) -> Dict[str, Any]:
         request: TestIDRequest object containing the test_id
 
     Returns:
-        Dict containing success message and test_id
+        Dict containing an acceptance message, test_id and status_url; the test is scored in the
+        background (scores land in test_records, the run's result is at status_url)
 
     Raises:
-        HTTPException: If test_id is invalid or empty
+        HTTPException: If test_id is invalid or empty, or 429 with Retry-After when the
+            processing queue is full
     """
     global received_test_id  # Store test_id globally
-    if not request.test_id:
+    test_id = request.test_id
+    record_timing(test_id, None, "received", time.time())
+    if not test_id:
         raise HTTPException(status_code=400, detail="Test ID cannot be empty")
 
-    received_test_id = request.test_id  # Store test_id in the variable
-    print(f"Received test_id: {received_test_id}")
-    # Run speech_processing.py and cdt.py scripts
-    subprocess.run(["python3", "processing/speech_processing.py", received_test_id])
-    subprocess.run(["python3", "processing/cdt/cdt.py", received_test_id])
+    # Requests now run concurrently, so only the local test_id is used past this point
+    received_test_id = test_id
+    print(f"Received test_id: {test_id}")
+
+    # Duplicates of a running or just finished test need no slot, so only new runs are turned away
+    if single_flight.recent(test_id) is not None:
+        source = "recent"
+    elif single_flight.running(test_id):
+        source = "joined"
+    else:
+        # The queue place is taken before answering, so every 202 is a run the queue has room for
+        try:
+            admission.reserve()
+        except Saturated as e:
+            admission.rejected += 1
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        source = "queued"
+
+    # Answered now rather than after the run, which can take longer than any client timeout;
+    # duplicates share the run, and everyone gets its result from the status URL
+    background_tasks.add_task(score_test, test_id, source == "queued")
+    return {
+        "message": "Test ID accepted for processing",
+        "test_id": test_id,
+        "source": source,
+        "status_url": f"/tests/{test_id}/status",
+    }
+
+
+async def score_test(test_id: str, reserved: bool = False):
+    started = False
+
+    async def job():
+        nonlocal started
+        started = True
+        return await admit_and_run(test_id, reserved)
+
+    try:
+        # Duplicate submissions share one run (and one admission slot) instead of racing it
+        result, source = await single_flight.run(test_id, job, succeeded)
+    except Exception as e:
+        print(f"Scoring test {test_id} failed: {e}")
+        return
+    finally:
+        # A concurrent duplicate may have reserved a place too, then joined the first one's run
+        if reserved and not started:
+            admission.release()
+    print(f"Scored test {test_id} ({source}): {result}")
+
+
+async def admit_and_run(test_id: str, reserved: bool = False) -> Dict[str, Any]:
+    # Settled before taking a slot: incremental runs need slots too, so waiting on them while
+    # holding one could starve them
+    already_scored = await incremental.settle(test_id)
+    async with admission.slot(reserved):
+        record_timing(test_id, None, "admitted", time.time())
+        return await run_pipeline(test_id, already_scored)
+
+
+def succeeded(result: Dict[str, Any]) -> bool:
+    # Only clean runs are short-circuited on resubmission; failed ones may be retried
+    return result["speech_returncode"] == 0 and result["cdt_returncode"] == 0
+
+
+async def run_script(test_id: str, script: str, stage: str, *args: str) -> int:
+    # A child process awaited on the event loop, so queued requests and /health stay responsive
+    with timed(test_id, None, stage):
+        process = await asyncio.create_subprocess_exec(sys.executable, script, test_id, *args, env=WORKER_ENV)
+        exited = asyncio.ensure_future(process.wait())
+        # Sample the child's thread count while it runs, to confirm the budget holds
+        while not exited.done():
+            await asyncio.wait({exited}, timeout=THREAD_SAMPLE_INTERVAL_SECONDS)
+            threads = count_threads(process.pid) if not exited.done() else None
+            if threads is not None and threads > peak_worker_threads.get(stage, 0):
+                peak_worker_threads[stage] = threads
+        return exited.result()
+
+
+async def run_pipeline(test_id: str, already_scored: frozenset = frozenset()) -> Dict[str, Any]:
+    """
+    Run the speech and CDT scoring scripts for a test, one after the other, skipping the
+    subtests incremental scoring already covered.
+    """
+    start = time.perf_counter()
+    skip = [arg for subtest in sorted(already_scored - {CDT_SUBTEST}) for arg in ("--skip", subtest)]
+    speech_returncode = await run_script(test_id, SPEECH_SCRIPT, "speech_script", *skip)
+    cdt_returncode = 0
+    if CDT_SUBTEST not in already_scored:
+        cdt_returncode = await run_script(test_id, CDT_SCRIPT, "cdt_script")
+    admission.record_duration(time.perf_counter() - start)
+
+    result = {
+        "speech_returncode": speech_returncode,
+        "cdt_returncode": cdt_returncode,
+        "scored_incrementally": sorted(already_scored),
+    }
+    if succeeded(result):
+        admission.completed += 1
+    else:
+        admission.failed += 1
+    return result
+
+
+async def score_subtests(test_id: str, subtests: set) -> set:
+    """
+    Incremental run for rows that just landed; returns the subtests it scored. It queues for a
+    slot like any submission; when the queue is full it scores nothing and leaves the subtests
+    to the test's explicit run.
+    """
+    try:
+        async with admission.slot():
+            scored = set()
+            speech = sorted(subtests - {CDT_SUBTEST})
+            if speech:
+                args = [arg for subtest in speech for arg in ("--subtest", subtest)]
+                # The script exits 0 only when every subtest it was given has been written
+                if await run_script(test_id, SPEECH_SCRIPT, "speech_script", *args) == 0:
+                    scored.update(speech)
+            if CDT_SUBTEST in subtests and await run_script(test_id, CDT_SCRIPT, "cdt_script") == 0:
+                scored.add(CDT_SUBTEST)
+            return scored
+    except Saturated:
+        print(f"Processing queue is full, leaving {sorted(subtests)} of {test_id} to its explicit run")
+        return set()
+
 
-    return {"message": "Test ID received successfully", "test_id": received_test_id}
+def explicit_run_owns(test_id: str) -> bool:
+    # settle() runs inside the single-flight run, so from then on the test counts as running
+    return single_flight.running(test_id) or single_flight.recent(test_id) is not None
 
 
+incremental = IncrementalScorer(score_subtests, PROCESSING_NOTIFY_DEBOUNCE_SECONDS, explicit_run_owns)
+
+
+@app.get("/tests/{test_id}/status")
+async def test_status(test_id: str, wait: bool = False) -> Dict[str, Any]:
+    """
+    Result of a test's scoring run, shared by every submission of it: "running" while the run
+    goes on, "done" with the result of a clean run within the dedup window. With wait=true a
+    running test is waited for, and its result comes back "done" or "failed".
+
+    Raises:
+        HTTPException: 404 if the test is neither running nor recently scored (not submitted,
+            still queued, outside the window, or its run failed and may be resubmitted)
+    """
+    result = single_flight.recent(test_id)
+    if result is None and single_flight.running(test_id):
+        if not wait:
+            return {"test_id": test_id, "status": "running"}
+        result = await single_flight.wait(test_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No recent scoring run for test {test_id}")
+    return {"test_id": test_id, "status": "done" if succeeded(result) else "failed", "result": result}
+
+
+@app.get("/admission/stats")
+async def admission_stats() -> Dict[str, Any]:
+    """
+    In-flight jobs, queue depth, admission/rejection counters, duplicate coalescing, the
+    per-worker thread budget against the most threads observed in each scoring script, and
+    incremental scoring from insert notifications.
+    """
+    return {
+        **admission.stats(),
+        "dedup": single_flight.stats(),
+        "threads": {"per_worker_budget": WORKER_THREADS, "peak_observed": dict(peak_worker_threads)},
+        "incremental": incremental.stats(),
+    }
+
 
 if __name__ == "__main__":
     import uvicorn
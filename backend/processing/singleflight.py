@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Retries and double taps resubmit the same test_id; a test that finished scoring within this
+# window is answered from its last result instead of being scored again
+PROCESSING_DEDUP_WINDOW_SECONDS = int(os.getenv("PROCESSING_DEDUP_WINDOW_SECONDS", "300"))
+PROCESSING_DEDUP_MAX_ENTRIES = int(os.getenv("PROCESSING_DEDUP_MAX_ENTRIES", "10000"))
+
+
+class SingleFlight:
+    """
+    Runs at most one job per key at a time. Callers arriving while a job runs wait for and share
+    its result; callers within window_seconds after a successful run get that result straight away.
+    """
+
+    def __init__(self, window_seconds: int, max_entries: int):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._in_flight = {}
+        # key -> (result, finished_at), oldest first
+        self._recent = OrderedDict()
+        self.started = 0
+        self.joined = 0
+        self.recent_hits = 0
+
+    def _recent_result(self, key):
+        now = time.time()
+        while self._recent:
+            oldest_key, (_, finished_at) = next(iter(self._recent.items()))
+            if now - finished_at < self.window_seconds:
+                break
+            del self._recent[oldest_key]
+        entry = self._recent.get(key)
+        return entry[0] if entry else None
+
+    def remember(self, key, result):
+        self._recent.pop(key, None)
+        self._recent[key] = (result, time.time())
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def running(self, key) -> bool:
+        return key in self._in_flight
+
+    def recent(self, key):
+        """The result of a successful run within the window, or None."""
+        return self._recent_result(key)
+
+    async def wait(self, key):
+        """Waits for and returns the result of key's running job, or None if none is running."""
+        task = self._in_flight.get(key)
+        if task is None:
+            return None
+        return await asyncio.shield(task)
+
+    async def _run(self, key, job, succeeded):
+        try:
+            result = await job()
+            if succeeded(result):
+                self.remember(key, result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    async def run(self, key, job, succeeded=lambda result: True):
+        """
+        Returns (result, source) where source is "run" for the caller that started the job,
+        "joined" for callers that attached to it and "recent" for a short-circuited repeat.
+        job is a coroutine function; only results passing succeeded() are remembered.
+        """
+        result = self._recent_result(key)
+        if result is not None:
+            self.recent_hits += 1
+            return result, "recent"
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, job, succeeded))
+            self._in_flight[key] = task
+            self.started += 1
+            source = "run"
+        else:
+            self.joined += 1
+            source = "joined"
+        # Shielded so a caller that goes away doesn't cancel the job for everyone else
+        return await asyncio.shield(task), source
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window_seconds,
+            "in_flight": len(self._in_flight),
+            "recent": len(self._recent),
+            "started": self.started,
+            "joined": self.joined,
+            "recent_hits": self.recent_hits,
+        }
+
+
+single_flight = SingleFlight(PROCESSING_DEDUP_WINDOW_SECONDS, PROCESSING_DEDUP_MAX_ENTRIES)
@@ -1,11 +1,12 @@
+import argparse
 import os
 import re
+import sys
 import time
-import spacy
 import string
 from rapidfuzz import fuzz
-from word2number import w2n
-from utils import DatabaseUtil 
+from verbal_fluency import VERBAL_FLUENCY_BACKEND, is_number_word, load_verbal_fluency_nlp
+from utils import DatabaseUtil, apply_thread_budget, record_timing, timed, test_id as default_test_id
 
 def get_data(subtest_name):
     db_util = DatabaseUtil()
@@ -95,12 +96,9 @@ def get_verbal_fluency_score(expected_responses, actual_responses, nlp, threshol
         if not word.startswith(target_letter):
             continue
 
-        # Exclude numbers (convert words like "four" → 4)
-        try:
-            num_value = w2n.word_to_num(word)
-            continue  # Skip if it's a number
-        except ValueError:
-            pass  # Not a number, continue processing
+        # Exclude numbers (words like "four" that word2number would convert → 4)
+        if is_number_word(word):
+            continue
 
         # Exclude proper nouns (e.g., "Boston", "Bob")
         if token.pos_ == "PROPN":
@@ -136,10 +134,56 @@ def get_orientation_score(expected_responses, actual_responses, threshold=85):
     return actual_responses, score, total_score
 
 
+# Scoring function for every speech subtest, in the order they are processed
+SPEECH_SCORERS = {
+    "naming": get_naming_score,
+    "memory": get_memory_score,
+    "attention_fs": get_attention_fs_score,
+    "attention_bs": get_attention_bs_score,
+    "attention_ss": get_attention_ss_score,
+    "sentence_repetition": get_sentence_repetiion_score,
+    "verbal_fluency": get_verbal_fluency_score,
+    "orientation": get_orientation_score,
+}
+
+# Bump a subtest's version whenever its scoring rules or thresholds change, so
+# rescore.py picks up the rows scored under the previous rules
+SCORER_VERSIONS = {
+    "naming": "1",
+    "memory": "1",
+    "attention_fs": "1",
+    "attention_bs": "1",
+    "attention_ss": "1",
+    "sentence_repetition": "1",
+    # The language backend is part of the version, since it can change which words count
+    "verbal_fluency": f"1-{VERBAL_FLUENCY_BACKEND}",
+    "orientation": "1",
+}
+
+
+def score_record(record, nlp=None):
+    """
+    Scores a single TestRecord with the scorer registered for its subtest.
+    Returns (extracted_responses, score, aggregated_score).
+    """
+    scorer = SPEECH_SCORERS[record.subtest_name]
+    if record.subtest_name == "verbal_fluency":
+        return scorer(record.expected_responses, record.actual_responses, nlp)
+    return scorer(record.expected_responses, record.actual_responses)
 
 
 if __name__ == "__main__":
-    
+    parser = argparse.ArgumentParser(description="Score the speech subtests of a test.")
+    parser.add_argument("test_id", nargs="?", default=default_test_id)
+    parser.add_argument("--subtest", action="append", help="Only score this subtest (repeatable).")
+    parser.add_argument("--skip", action="append", default=[], help="Don't score this subtest (repeatable).")
+    args = parser.parse_args()
+    test_id = args.test_id
+    # Imports are done; the time since the server dispatched this script is start-up cost
+    record_timing(test_id, None, "speech_ready", time.time())
+    # Holds OpenCV, TensorFlow, OpenMP and BLAS to the per-worker budget server.py passed in
+    apply_thread_budget()
+
     db_util = DatabaseUtil()
     try:
         db_util.SessionFactory()
@@ -147,153 +191,43 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Failed to establish connection: {e}")
 
-
-
-    # calculatate and store score for naming test
-    df = db_util.extract_data("naming")
-    # print(df["expected_responses"].iloc[0])
-    extracted_responses, score, aggregated_score = get_naming_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    score = [int(num) for num in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-    #######################################################################################################################
-    # calculatate and store score for Memory test
-    df = db_util.extract_data("memory")
-    # print(df["expected_responses"].iloc[0])
-    extracted_responses, score, aggregated_score = get_memory_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [[int(num) for num in sublist] for sublist in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-    
-    #######################################################################################################################
-    # calculatate and store score for attention forward span test
-    df = db_util.extract_data("attention_fs")
-    # print(df["expected_responses"].iloc[0])
-    extracted_responses, score, aggregated_score = get_attention_fs_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [int(num) for num in score] # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-    #######################################################################################################################
-    # calculatate and store score for attention backward span test
-    df = db_util.extract_data("attention_bs")
-    # print(df["expected_responses"].iloc[0])
-    extracted_responses, score, aggregated_score = get_attention_bs_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [int(num) for num in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-
-    #######################################################################################################################
-    # calculatate and store score for serial 7 test
-    df = db_util.extract_data("attention_ss")
-    # print(df["expected_responses"].iloc[0])
-    extracted_responses, score, aggregated_score = get_attention_ss_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [int(num) for num in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-    ########################################################################################################################
-    # calculatate and store score for sentence repitition test
-    df = db_util.extract_data("sentence_repetition")
-    # print(df["expected_responses"].iloc[0])
-    extracted_responses, score, aggregated_score = get_sentence_repetiion_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [int(num) for num in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-     ########################################################################################################################
-    # calculatate and store score for verbal fluency test
-    df = db_util.extract_data("verbal_fluency")
-    # print(df["expected_responses"].iloc[0])
-    nlp = spacy.load("en_core_web_lg")
-    extracted_responses, score, aggregated_score = get_verbal_fluency_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0], nlp)
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [int(num) for num in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-
-     ########################################################################################################################
-    # calculatate and store score for abstraction test
-    df = db_util.extract_data("orientation", '6WSG3E_20250309')
-    # print(df["expected_responses"].iloc[0])
-
-    extracted_responses, score, aggregated_score = get_orientation_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0])
-
-    # Convert numpy types to native Python types
-    subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # print(score)
-    score = [int(num) for num in score]  # Convert list elements to int
-    aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # print(score, aggregated_score)
-    db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-     ########################################################################################################################
-    # # calculatate and store score for abstraction test
-    # df = db_util.extract_data("abstraction")
-    # # print(df["expected_responses"].iloc[0])
-    # nlp = spacy.load("en_core_web_lg")
-    # extracted_responses, score, aggregated_score = get_abstraction_score(df["expected_responses"].iloc[0], df["actual_responses"].iloc[0], nlp)
-
-    # # Convert numpy types to native Python types
-    # subtest_id = int(df["subtest_id"].iloc[0])  # Convert numpy.int64 to int
-    # # print(score)
-    # score = [int(num) for num in score]  # Convert list elements to int
-    # aggregated_score = int(aggregated_score)  # Convert numpy.int64 to int
-    # # print(score, aggregated_score)
-    # db_util.load_data(subtest_id, extracted_responses, score, aggregated_score)
-
-
-
-    db_util.close_connection()
-    print("Database connection closed successfully.")
-
-
-
-    
-
-
-
-
+    try:
+        nlp = None
+        # Subtests this run should have written but didn't; server.py only counts a subtest as
+        # scored (and skips it in the final run) when the script exits 0
+        failed = []
+        for subtest_name in SPEECH_SCORERS:
+            # Incremental runs name the subtests that just landed; the final run skips those done
+            if (args.subtest and subtest_name not in args.subtest) or subtest_name in args.skip:
+                continue
+
+            # calculate and store score for each speech subtest
+            with timed(test_id, subtest_name, "fetch"):
+                record = db_util.fetch_record(subtest_name, test_id)
+            if record is None:
+                print(f"No {subtest_name} record found for test {test_id}.")
+                # Tests don't have to include every subtest, unless this run was asked for it
+                if args.subtest:
+                    failed.append(subtest_name)
+                continue
+
+            with timed(test_id, subtest_name, "score"):
+                if subtest_name == "verbal_fluency" and nlp is None:
+                    nlp = load_verbal_fluency_nlp()
+
+                # Rows come back as plain Python values, so no numpy conversions are needed
+                extracted_responses, score, aggregated_score = score_record(record, nlp)
+
+            with timed(test_id, subtest_name, "write"):
+                written = db_util.load_data(
+                    record.subtest_id, extracted_responses, score, aggregated_score, SCORER_VERSIONS[subtest_name]
+                )
+            if not written:
+                failed.append(subtest_name)
+
+        if failed:
+            print(f"Not scored for test {test_id}: {', '.join(failed)}")
+            sys.exit(1)
+    finally:
+        db_util.close_connection()
+        print("Database connection closed successfully.")
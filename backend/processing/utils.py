@@ -1,7 +1,12 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-import pandas as pd
+import json
+import mmap
 import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
 from urllib.parse import quote_plus
 
 from PIL import Image
@@ -18,13 +23,156 @@ DB_URL = f"postgresql://{DB_USERNAME}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PO
 
 test_id = "6WSG3E_20250309"
 
+# Content-addressed image store written by the API (backend/image_store.py):
+# each image lives at <root>/<ab>/<cd>/<sha256>. It must be the API's store mounted here too
+# (the image_store volume in docker-compose.yml, or a shared mount on a separate host), since
+# uploads are only written to the store
+IMAGE_STORE_ROOT = os.getenv("IMAGE_STORE_ROOT", "/var/lib/parkinsons/images")
+
+
+def image_store_path(key, root=IMAGE_STORE_ROOT):
+    return os.path.join(root, key[:2], key[2:4], key)
+
+
+def open_stored_image(key, root=IMAGE_STORE_ROOT):
+    """
+    Memory-maps a stored image read-only. The map supports the buffer protocol, so
+    np.frombuffer/cv2.imdecode read the page cache directly without copying the file.
+    """
+    with open(image_store_path(key, root), "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+# When set, every processing stage appends one JSON line {test_id, subtest, stage, start, end}
+# (wall-clock seconds) to this file; loadtest/bench_processing.py reads it
+PROCESSING_TIMINGS_FILE = os.getenv("PROCESSING_TIMINGS_FILE")
+
+
+def record_timing(test_id, subtest, stage, start, end=None):
+    if not PROCESSING_TIMINGS_FILE:
+        return
+    line = json.dumps({"test_id": test_id, "subtest": subtest, "stage": stage, "start": start,
+                       "end": start if end is None else end})
+    # One short O_APPEND write per line, so lines from concurrent processes don't interleave
+    with open(PROCESSING_TIMINGS_FILE, "a") as f:
+        f.write(line + "\n")
+
+
+@contextmanager
+def timed(test_id, subtest, stage):
+    """Records how long the enclosed block took as one timing line."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        record_timing(test_id, subtest, stage, start, time.time())
+
+
+# Threads each scoring worker process may use. OpenCV, TensorFlow, OpenMP (sklearn) and BLAS
+# each default to one thread per core, so several workers on a host oversubscribe it many times
+# over; unset, the host's cores are split evenly across the concurrent workers
+PROCESSING_THREADS_PER_WORKER = os.getenv("PROCESSING_THREADS_PER_WORKER")
+
+# Read by the native libraries when they initialize their pools
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "OPENCV_FOR_THREADS_NUM",
+    "TF_NUM_INTRAOP_THREADS",
+)
+
+
+def available_cores():
+    # Respects CPU affinity (e.g. docker --cpuset-cpus), unlike os.cpu_count()
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def thread_budget(workers=1):
+    """Threads per worker process when `workers` of them run at once on this host."""
+    if PROCESSING_THREADS_PER_WORKER:
+        return max(1, int(PROCESSING_THREADS_PER_WORKER))
+    return max(1, available_cores() // max(1, workers))
+
+
+def thread_budget_env(threads):
+    """
+    Environment for a worker process started with the given budget, so every library sizes its
+    pool correctly at import. TensorFlow's inter-op pool only overlaps independent ops of one
+    small model here, so it gets a single thread.
+    """
+    env = dict(os.environ)
+    env.update({name: str(threads) for name in THREAD_ENV_VARS})
+    env["TF_NUM_INTEROP_THREADS"] = "1"
+    env["PROCESSING_THREADS_PER_WORKER"] = str(threads)
+    return env
+
+
+def apply_thread_budget(threads=None):
+    """
+    Caps the thread pools of this worker process; call once at worker start, before any scoring.
+    Covers libraries already imported (which ignore the environment from then on) and exports the
+    budget for ones imported later. Returns the budget.
+    """
+    threads = threads or thread_budget()
+    os.environ.update(thread_budget_env(threads))
+
+    cv2 = sys.modules.get("cv2")
+    if cv2 is not None:
+        cv2.setNumThreads(threads)
+
+    tensorflow = sys.modules.get("tensorflow")
+    if tensorflow is not None:
+        try:
+            tensorflow.config.threading.set_intra_op_parallelism_threads(threads)
+            tensorflow.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError:
+            pass  # Runtime already initialized; the environment set before import applies
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        pass
+    else:
+        # BLAS and OpenMP runtimes already loaded by numpy/scipy/sklearn
+        threadpool_limits(limits=threads)
+    return threads
+
+
+def count_threads(pid="self"):
+    """Threads of a process right now, from /proc; None where that isn't available."""
+    try:
+        return len(os.listdir(f"/proc/{pid}/task"))
+    except OSError:
+        return None
+
+
+RECORD_COLUMNS = "test_id, subtest_id, subtest_name, expected_responses, actual_responses"
+
+
+class TestRecord(NamedTuple):
+    """
+    A single test_records row holding plain Python values (no pandas/numpy types).
+    """
+
+    test_id: str
+    subtest_id: int
+    subtest_name: str
+    expected_responses: list
+    actual_responses: list
+
 
 class DatabaseUtil:
     def __init__(self):
         """
         Initializes the database connection.
         """
-        self.engine = create_engine(DB_URL)
+        # values_plus_batch lets psycopg2 send executemany UPDATEs in pages instead of row by row
+        self.engine = create_engine(DB_URL, executemany_mode="values_plus_batch")
         print(DB_URL)
         self.SessionFactory = sessionmaker(bind=self.engine)
         self.session = self.SessionFactory()  # Safer approach
@@ -34,27 +182,91 @@ class DatabaseUtil:
         """
         Fetches test records based on the given subtest_name and test_id.
 
+        Kept for callers that want a DataFrame; the scoring scripts use fetch_record instead.
+
         :param subtest_name: The name of the subtest to filter.
         :return: Pandas DataFrame containing test_id, subtest_id, subtest_name, expected_responses, actual_responses.
         """
-        query = """
-            SELECT test_id, subtest_id, subtest_name, expected_responses, actual_responses
+        import pandas as pd
+
+        records = self.fetch_records(subtest_name, test_id)
+        if records is None:
+            return None
+        return pd.DataFrame(records, columns=TestRecord._fields)
+
+    def fetch_records(self, subtest_name, test_id):
+        """
+        Fetches test records for the given subtest_name and test_id as TestRecord tuples.
+
+        :param subtest_name: The name of the subtest to filter.
+        :param test_id: The test the records belong to.
+        :return: List of TestRecord, or None if the query fails.
+        """
+        query = f"""
+            SELECT {RECORD_COLUMNS}
             FROM test_records
             WHERE subtest_name = :subtest_name AND test_id = :test_id
         """
-    # 
         params = {"subtest_name": subtest_name, "test_id": test_id}
 
         try:
-            connection = self.engine.connect()
-            result = connection.execute(text(query), params)
-            df = pd.DataFrame(result.fetchall(), columns=result.keys())
-            return df
+            with self.engine.connect() as connection:
+                result = connection.execute(text(query), params)
+                return [TestRecord(*row) for row in result]
         except Exception as e:
             print(f"Error fetching data: {e}")
             return None
 
-    def load_data(self, subtest_id, extracted_responses, score, aggregated_score):
+    def fetch_record(self, subtest_name, test_id):
+        """
+        Fetches the first test record for the given subtest_name and test_id.
+
+        :return: A TestRecord, or None if nothing matched or the query failed.
+        """
+        records = self.fetch_records(subtest_name, test_id)
+        return records[0] if records else None
+
+    def stream_rows(self, query, params=None, batch_size=1000):
+        """
+        Streams the rows of a query through a server-side cursor.
+
+        Only batch_size rows are held client-side at a time, so large scans run in constant memory.
+
+        :param query: SQL text to execute.
+        :param params: Bind parameters for the query.
+        :param batch_size: Number of rows fetched from the server per round-trip.
+        :return: Generator of plain tuples.
+        """
+        with self.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, max_row_buffer=batch_size
+            ).execute(text(query), params or {})
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield tuple(row)
+
+    def stream_records(self, subtest_name=None, batch_size=1000):
+        """
+        Streams test records, optionally restricted to one subtest, in subtest_id order.
+
+        :param subtest_name: The name of the subtest to filter, or None for all records.
+        :param batch_size: Number of rows fetched from the server per round-trip.
+        :return: Generator of TestRecord.
+        """
+        query = f"SELECT {RECORD_COLUMNS} FROM test_records"
+        params = {}
+        if subtest_name is not None:
+            query += " WHERE subtest_name = :subtest_name"
+            params["subtest_name"] = subtest_name
+        query += " ORDER BY subtest_id"
+
+        for row in self.stream_rows(query, params, batch_size):
+            yield TestRecord(*row)
+
+    def load_data(self, subtest_id, extracted_responses, score, aggregated_score, scorer_version=None):
         """
         Inserts extracted responses and score into the test_records table using subtest_id.
 
@@ -62,29 +274,49 @@ class DatabaseUtil:
         :param extracted_responses: Extracted responses from the test.
         :param score: Score calculated from the responses.
         :param aggregated_score: Aggregated score.
+        :param scorer_version: Version of the scorer that produced the score.
+        :return: True if the row was written.
+        """
+        return self.load_data_batch([(subtest_id, extracted_responses, score, aggregated_score, scorer_version)])
+
+    def load_data_batch(self, rows):
+        """
+        Writes many scored subtests back in a single transaction.
+
+        The engine batches executemany UPDATEs into few round-trips, so backfills can write
+        hundreds of rows per commit.
+
+        :param rows: Iterable of (subtest_id, extracted_responses, score, aggregated_score, scorer_version).
+        :return: True if the batch was committed.
         """
         query = """
             UPDATE test_records
-            SET extracted_responses = :extracted_responses, score = :score, aggregated_score = :aggregated_score
+            SET extracted_responses = :extracted_responses, score = :score, aggregated_score = :aggregated_score,
+                scorer_version = :scorer_version
             WHERE subtest_id = :subtest_id
         """
 
-        params = {
-            "subtest_id": subtest_id,
-            "extracted_responses": extracted_responses,
-            "score": score,
-            "aggregated_score": aggregated_score,
-        }
+        params = [
+            {
+                "subtest_id": subtest_id,
+                "extracted_responses": extracted_responses,
+                "score": score,
+                "aggregated_score": aggregated_score,
+                "scorer_version": scorer_version,
+            }
+            for subtest_id, extracted_responses, score, aggregated_score, scorer_version in rows
+        ]
+        if not params:
+            return True
 
         try:
-            connection = self.engine.connect()
-            transaction = connection.begin()  # Start a transaction
-            connection.execute(text(query), params)
-            transaction.commit()  # Commit the transaction
-            print("Data updated successfully.")
+            with self.engine.begin() as connection:  # Commits on success, rolls back on error
+                connection.execute(text(query), params)
+            print(f"Data updated successfully ({len(params)} rows).")
+            return True
         except Exception as e:
-            transaction.rollback()  # Rollback in case of error
             print(f"Error updating data: {e}")
+            return False
 
     def close_connection(self):
         """
@@ -96,27 +328,43 @@ class DatabaseUtil:
 
     def fetch_image(self, image_id):
         """
-        Fetches an image blob from the database and converts it into a PIL Image.
+        Fetches an image's bytes. Images in the on-disk store are returned as a read-only
+        memory map (no copy through Postgres or Python); rows not migrated yet, or whose file
+        isn't in this host's store, still return their bytea blob.
 
         :param image_id: The ID of the image to retrieve.
-        :return: A PIL Image object or None if an error occurs.
+        :return: A bytes-like object or None if an error occurs.
         """
+        # The blob is only read for rows without a key, so stored images never cross Postgres
         query = """
-            SELECT image_data FROM images WHERE image_id = :image_id
+            SELECT storage_key, CASE WHEN storage_key IS NULL THEN image_data END
+            FROM images WHERE image_id = :image_id
         """
         params = {"image_id": image_id}
 
         try:
-            connection = self.engine.connect()
-            result = connection.execute(text(query), params).fetchone()
-
-            if result and result[0]:  # Check if result exists
-                image_blob = result[0]  # Extract the bytea data
-                # image = Image.open(io.BytesIO(image_blob))  # Convert blob to image
-                return image_blob
-            else:
+            # Called from several pipeline threads; the connection goes back to the pool at once
+            with self.engine.connect() as connection:
+                result = connection.execute(text(query), params).fetchone()
+            if result is None or (not result[0] and not result[1]):
                 print("No image found with the given ID.")
                 return None
+            if not result[0]:  # Legacy bytea row
+                return result[1]
+
+            try:
+                return open_stored_image(result[0])
+            except OSError as e:
+                with self.engine.connect() as connection:
+                    blob = connection.execute(
+                        text("SELECT image_data FROM images WHERE image_id = :image_id"), params
+                    ).scalar()
+                if not blob:
+                    print(f"Image {image_id} is not readable from IMAGE_STORE_ROOT={IMAGE_STORE_ROOT} "
+                          f"and has no blob to fall back to: {e}")
+                    return None
+                print(f"Image {image_id} is not in the local store ({e}); using its blob.")
+                return blob
         except Exception as e:
             print(f"Error fetching image: {e}")
             return None
@@ -0,0 +1,191 @@
+"""
+Language backends for the verbal fluency scorer.
+
+get_verbal_fluency_score only needs each token's text, lemma_ and pos_, so the full
+en_core_web_lg pipeline is optional. The backend is picked per deployment with
+VERBAL_FLUENCY_BACKEND:
+
+    lg       en_core_web_lg without parser/ner (default, reference behaviour)
+    sm       en_core_web_sm without parser/ner
+    lexicon  a compact word -> (lemma, POS) table, no spaCy at all
+
+Usage (from the processing directory):
+    python3 verbal_fluency.py build-lexicon --corpus transcripts.txt [--output lexicon.tsv]
+    python3 verbal_fluency.py parity --corpus reference.tsv [--backend lexicon]
+"""
+
+import argparse
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+from word2number import w2n
+
+VERBAL_FLUENCY_BACKEND = os.getenv("VERBAL_FLUENCY_BACKEND", "lg")
+VERBAL_FLUENCY_LEXICON = os.getenv(
+    "VERBAL_FLUENCY_LEXICON",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "verbal_fluency_lexicon.tsv"),
+)
+
+SPACY_MODELS = {"lg": "en_core_web_lg", "sm": "en_core_web_sm"}
+
+# Only the tagger, attribute ruler and lemmatizer feed pos_ and lemma_
+SPACY_EXCLUDE = ["parser", "ner"]
+
+
+def _is_w2n_number(word):
+    try:
+        w2n.word_to_num(word)
+        return True
+    except ValueError:
+        return False
+
+
+# Every single word word2number accepts, computed once instead of calling
+# w2n.word_to_num in a try/except for every spoken token
+NUMBER_WORDS = frozenset(word for word in w2n.american_number_system if _is_w2n_number(word))
+
+
+def is_number_word(word):
+    """
+    Same answer as w2n.word_to_num succeeding on a single punctuation-free token.
+    """
+    return word.isdigit() or word in NUMBER_WORDS
+
+
+class LexiconToken(NamedTuple):
+    """
+    The subset of a spaCy token the verbal fluency scorer reads.
+    """
+
+    text: str
+    lemma_: str
+    pos_: str
+
+
+# Rough equivalent of spaCy's English tokenizer for spoken transcripts: splits off
+# contractions ("don't" -> "do", "n't"; "dog's" -> "dog", "'s") and punctuation
+TOKEN_PATTERN = re.compile(r"\w+(?=n't\b)|n't\b|'\w+|\w+|[^\w\s]")
+
+
+class LexiconNLP:
+    """
+    Callable stand-in for a spaCy pipeline backed by a word -> (lemma, POS) table.
+
+    The table only stores words whose lemma differs from the word or whose tag is PROPN;
+    every other word is its own lemma and is not a proper noun.
+    """
+
+    def __init__(self, path=VERBAL_FLUENCY_LEXICON):
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Verbal fluency lexicon not found at {path}; "
+                "generate it with `python3 verbal_fluency.py build-lexicon`."
+            )
+        self.entries = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                word, lemma, pos = line.rstrip("\n").split("\t")
+                self.entries[word] = (lemma, pos)
+
+    def __call__(self, text):
+        tokens = []
+        for word in TOKEN_PATTERN.findall(text):
+            lemma, pos = self.entries.get(word, (word, "X"))
+            tokens.append(LexiconToken(word, lemma, pos))
+        return tokens
+
+
+def load_verbal_fluency_nlp(backend=None):
+    """
+    Loads the configured verbal fluency backend.
+    """
+    backend = backend or VERBAL_FLUENCY_BACKEND
+    if backend == "lexicon":
+        return LexiconNLP()
+    if backend not in SPACY_MODELS:
+        raise ValueError(f"Unknown verbal fluency backend: {backend}")
+
+    import spacy
+
+    return spacy.load(SPACY_MODELS[backend], exclude=SPACY_EXCLUDE)
+
+
+def build_lexicon(corpus_path, output_path, backend="lg"):
+    """
+    Tags every transcript line of a corpus with a spaCy backend and writes the compact lexicon.
+    Each word keeps its most frequent (lemma, POS) pair.
+    """
+    nlp = load_verbal_fluency_nlp(backend)
+    counts = defaultdict(Counter)
+    with open(corpus_path, encoding="utf-8") as f:
+        for line in f:
+            for token in nlp(line.strip().lower()):
+                counts[token.text][(token.lemma_, token.pos_)] += 1
+
+    written = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for word in sorted(counts):
+            lemma, pos = counts[word].most_common(1)[0][0]
+            if lemma == word and pos != "PROPN":
+                continue
+            f.write(f"{word}\t{lemma}\t{pos}\n")
+            written += 1
+    print(f"Wrote {written} lexicon entries for {len(counts)} distinct words to {output_path}")
+
+
+def check_parity(corpus_path, backend, reference_backend="lg"):
+    """
+    Scores a reference corpus (lines of "letter<TAB>transcript") with both backends.
+    Returns True if every aggregated score matches.
+    """
+    from speech_processing import get_verbal_fluency_score
+
+    reference_nlp = load_verbal_fluency_nlp(reference_backend)
+    candidate_nlp = load_verbal_fluency_nlp(backend)
+
+    total = score_matches = word_matches = 0
+    with open(corpus_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            letter, transcript = line.rstrip("\n").split("\t", 1)
+            args = ([letter], [[transcript]])
+            ref_words, _, ref_total = get_verbal_fluency_score(*args, reference_nlp)
+            words, _, candidate_total = get_verbal_fluency_score(*args, candidate_nlp)
+
+            total += 1
+            score_matches += ref_total == candidate_total
+            word_matches += ref_words == words
+            if ref_total != candidate_total:
+                print(f"line {line_number}: score {candidate_total} != {ref_total} ({len(words)} vs {len(ref_words)} words)")
+
+    print(f"{backend} vs {reference_backend}: {score_matches}/{total} scores and {word_matches}/{total} word lists match")
+    return score_matches == total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verbal fluency backend tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build-lexicon", help="Build the compact lexicon from a transcript corpus.")
+    build.add_argument("--corpus", required=True, help="Text file with one transcript per line.")
+    build.add_argument("--output", default=VERBAL_FLUENCY_LEXICON)
+    build.add_argument("--backend", default="lg", choices=sorted(SPACY_MODELS))
+
+    parity = subparsers.add_parser("parity", help="Compare a backend's scores against en_core_web_lg.")
+    parity.add_argument("--corpus", required=True, help="TSV file of letter<TAB>transcript lines.")
+    parity.add_argument("--backend", default="lexicon")
+
+    args = parser.parse_args()
+    if args.command == "build-lexicon":
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        build_lexicon(args.corpus, args.output, args.backend)
+    else:
+        sys.exit(0 if check_parity(args.corpus, args.backend) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import AsyncStorage from '@react-native-async-storage/async-storage';
 import { Platform } from 'react-native';
 import { NAMING_QUESTIONS } from '@/constants/TestQuestions';
 import * as FileSystem from 'expo-file-system';
+import type { MoCATestResult } from '@/constants/database';
 
 interface HealthResponse {
   status: string;
@@ -92,6 +93,12 @@ interface TestRecord {
   timestamp: string;
 }
 
+interface SubmitTestResponse {
+  success: boolean;
+  test_id: string;
+  subtest_ids: number[];
+}
+
 // Add interface for image upload response
 interface ImageUploadResponse {
   image_id: number;
@@ -276,36 +283,40 @@ export const submitTestRecord = async (
   }
 };
 
-// Helper function to submit all test data
+// Submit a whole MoCA test in one request; the backend stores every subtest in a
+// single transaction and forwards the test to the processing service
 export const submitAllTestData = async (testResult: MoCATestResult): Promise<boolean> => {
   try {
     const subtests = [
-      { name: '@memory_data', data: testResult.memory },
-      { name: '@delayed_recall_data', data: testResult.delayed_response },
-      { name: '@attention_fs_data', data: testResult.attention_fs },
-      { name: '@attention_bs_data', data: testResult.attention_bs },
-      { name: '@sentence_repetition_data', data: testResult.senetence_reptition },
-      { name: '@visuospatial_clock_data', data: testResult.visuospatial_clock },
-      // Add other subtests as needed
+      { subtest_name: 'memory', data: testResult.memory },
+      { subtest_name: 'delayed_recall', data: testResult.delayed_response },
+      { subtest_name: 'attention_fs', data: testResult.attention_fs },
+      { subtest_name: 'attention_bs', data: testResult.attention_bs },
+      { subtest_name: 'sentence_repetition', data: testResult.senetence_reptition },
+      { subtest_name: 'orientation', data: testResult.orientation },
+      {
+        subtest_name: 'cdt',
+        data: { expected_responses: null, actual_responses: [String(testResult.visuospatial_clock.image_id)] }
+      },
     ];
 
-    for (const subtest of subtests) {
-      const success = await submitTestRecord(
-        testResult.patientId,
-        testResult.testId,
-        subtest.name,
-        subtest.data
-      );
-
-      if (!success) {
-        console.error(`Failed to submit ${subtest.name}`);
-        return false;
-      }
-    }
+    const token = await AsyncStorage.getItem('userToken');
+    const response = await api.post<SubmitTestResponse>(
+      '/tests/',
+      {
+        subtests: subtests.map(({ subtest_name, data }) => ({
+          subtest_name,
+          expected_responses: data.expected_responses || null,
+          actual_responses: data.actual_responses || [],
+        })),
+      },
+      { headers: { 'Authorization': `Bearer ${token}` } }
+    );
 
-    return true;
-  } catch (error) {
-    console.error('Error submitting all test data:', error);
+    console.log('Test submitted successfully:', response.data.test_id);
+    return response.data.success;
+  } catch (error: any) {
+    console.error('Error submitting all test data:', error.response?.data || error);
     return false;
   }
-};
\ No newline at end of file
+};
@@ -73,6 +73,14 @@ interface Patient {
   created_at: string;
 }
 
+interface TestSummary {
+  test_id: string;
+  test_date: string;
+  subtest_scores: Record<string, number>;
+  total_score: number;
+  updated_at: string | null;
+}
+
 export const patientApi = {
   getPatientById: async (patientId: string): Promise<Patient> => {
     const token = localStorage.getItem('access_token');
@@ -95,5 +103,64 @@ export const patientApi = {
     } catch (error) {
       throw error;
     }
+  },
+
+  getPatientHistory: async (patientId: string): Promise<TestSummary[]> => {
+    const token = localStorage.getItem('access_token');
+
+    try {
+      const response = await fetch(`${API_BASE_URL}/patients/${patientId}/history`, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+      });
+
+      if (!response.ok) {
+        throw new Error('Failed to fetch patient history');
+      }
+
+      return response.json();
+    } catch (error) {
+      throw error;
+    }
+  }
+};
+
+export interface TestScoredEvent {
+  patient_id: string;
+  test_id: string;
+  total_score: number | null;
+}
+
+export const scoreEventsApi = {
+  // Calls onScored whenever a test of one of the doctor's patients finishes scoring, instead of
+  // re-fetching patient data on a timer. Returns a function that closes the stream.
+  subscribe: (
+    onScored: (event: TestScoredEvent) => void,
+    onClosed?: () => void,
+  ): (() => void) => {
+    const token = localStorage.getItem('access_token');
+    // EventSource can't send an Authorization header, so the token goes in the query string
+    const source = new EventSource(
+      `${API_BASE_URL}/doctors/me/score-events?access_token=${encodeURIComponent(token ?? '')}`,
+      { withCredentials: true },
+    );
+
+    source.addEventListener('test_scored', (event) => {
+      onScored(JSON.parse((event as MessageEvent).data));
+    });
+
+    // The browser reconnects on its own after network errors; CLOSED means it gave up
+    // (e.g. the token expired), so the caller has to log in again or resubscribe
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && onClosed) {
+        onClosed();
+      }
+    };
+
+    return () => source.close();
   }
-};
\ No newline at end of file
+};